@@ -0,0 +1,60 @@
+"""Compare serial and process-pool rendering of the five report figures.
+
+Usage: python benchmarks/bench_render.py [export.xlsx] [--workers N] [--dpi DPI]
+"""
+import argparse
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from coe_kpi import aggregate  # noqa: E402
+from coe_kpi.preprocess import preprocess_tickets  # noqa: E402
+from coe_kpi.render import render_pngs, report_figure_makers  # noqa: E402
+from coe_kpi.snapshot import SnapshotCache  # noqa: E402
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("export", nargs="?", default="coe_kpi_05_2023.xlsx")
+    parser.add_argument("--workers", type=int, default=5)
+    parser.add_argument("--dpi", type=int, default=200)
+    args = parser.parse_args()
+
+    tickets = preprocess_tickets(SnapshotCache().load(args.export))
+    makers = report_figure_makers(
+        aggregate.build_cube(tickets),
+        primary_year=2019,
+        current_year=2023,
+        current_month=6,
+    )
+
+    serial = timed(lambda: render_pngs(makers, dpi=args.dpi))
+
+    pool = ProcessPoolExecutor(
+        max_workers=args.workers, mp_context=multiprocessing.get_context("spawn")
+    )
+    with pool:
+        startup = timed(lambda: pool.submit(int).result())
+        # The first round also pays for importing matplotlib/seaborn in workers.
+        first = timed(lambda: render_pngs(makers, dpi=args.dpi, pool=pool))
+        warm = timed(lambda: render_pngs(makers, dpi=args.dpi, pool=pool))
+
+    print(f"{len(makers)} figures at {args.dpi} DPI, {args.workers} workers")
+    print(f"serial             {serial:7.2f}s")
+    print(f"pool start-up      {startup:7.2f}s")
+    print(f"parallel (cold)    {first:7.2f}s")
+    print(f"parallel (warm)    {warm:7.2f}s  ({serial / warm:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
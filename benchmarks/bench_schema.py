@@ -0,0 +1,96 @@
+"""Report the ticket frame's memory and groupby/``isin`` speed per dtype schema.
+
+"before" is the frame with plain object strings and default integer widths
+(what preprocessing produced before ``COLUMN_DTYPES`` and ``DERIVED_DTYPES``);
+"after" is ``preprocess_tickets``' output.
+
+Usage: python benchmarks/bench_schema.py [export.xlsx] [--rows N]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import pandas as pd  # noqa: E402
+
+from benchmarks.synthetic import synthesize  # noqa: E402
+from coe_kpi.ingest import read_export  # noqa: E402
+from coe_kpi.preprocess import COLUMN_DTYPES, preprocess_tickets  # noqa: E402
+
+
+def untyped(tickets):
+    """``tickets`` with strings as objects and calendar columns at default widths."""
+    return tickets.astype(
+        {
+            **{
+                column: object
+                for column, dtype in COLUMN_DTYPES.items()
+                if not dtype.startswith("datetime")
+            },
+            "month_opened": "int32",
+            "year_opened": "int32",
+            "day_opened": "int32",
+            "week_opened": "UInt32",
+        }
+    )
+
+
+def best_of(func, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def workload(tickets):
+    products = list(tickets.product_type.value_counts().index[:6])
+    return {
+        "groupby": best_of(
+            lambda: tickets.groupby(
+                ["year_opened", "month_opened", "product_type"], observed=True
+            ).size()
+        ),
+        "isin": best_of(lambda: tickets.product_type.isin(products)),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("export", nargs="?", default=str(ROOT / "coe_kpi_05_2023.xlsx"))
+    parser.add_argument("--rows", type=int, help="resample the export to N rows")
+    args = parser.parse_args(argv)
+
+    raw = read_export(args.export)
+    if args.rows:
+        raw = synthesize(raw, args.rows)
+    after = preprocess_tickets(raw)
+    before = untyped(after)
+
+    usage = pd.DataFrame(
+        {
+            "before": before.memory_usage(deep=True, index=False),
+            "after": after.memory_usage(deep=True, index=False),
+        }
+    )
+    usage.loc["total"] = usage.sum()
+    usage["ratio"] = (usage.before / usage.after).round(1)
+    print(f"{len(after)} tickets, bytes per column:")
+    print(usage.astype({"before": int, "after": int}).to_string())
+    print(
+        f"bytes per row: {usage.before.total / len(after):.0f} before, "
+        f"{usage.after.total / len(after):.0f} after"
+    )
+
+    timings = pd.DataFrame({"before": workload(before), "after": workload(after)})
+    timings["speedup"] = (timings.before / timings.after).round(1)
+    print("\nseconds (best of 5):")
+    print(timings.to_string())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
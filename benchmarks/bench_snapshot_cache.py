@@ -0,0 +1,39 @@
+"""Compare cold (openpyxl parse) and warm (memory-mapped Parquet) export loads.
+
+Usage: python benchmarks/bench_snapshot_cache.py [export.xlsx ...]
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from coe_kpi.snapshot import SnapshotCache, file_digest  # noqa: E402
+
+DEFAULT_EXPORTS = ["coe_kpi_04_2023.xlsx", "coe_kpi_05_2023.xlsx"]
+
+
+def time_load(cache, path, digest):
+    start = time.perf_counter()
+    df = cache.load(path, digest=digest)
+    return time.perf_counter() - start, len(df)
+
+
+def main(paths):
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = SnapshotCache(cache_dir)
+        print(
+            f"{'export':<28}{'rows':>8}{'cold (s)':>10}{'warm (s)':>10}{'speedup':>9}"
+        )
+        for path in paths:
+            digest = file_digest(path)
+            cold, rows = time_load(cache, path, digest)
+            warm = min(time_load(cache, path, digest)[0] for _ in range(5))
+            print(
+                f"{Path(path).name:<28}{rows:>8}{cold:>10.3f}{warm:>10.4f}{cold / warm:>8.0f}x"
+            )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or DEFAULT_EXPORTS)
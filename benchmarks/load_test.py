@@ -0,0 +1,182 @@
+"""Load-test the dashboard with concurrent sessions against a local server.
+
+For each ``--sessions`` count a fresh ``streamlit run streamlit_app.py`` is
+started on a free port, with an empty cache directory unless ``--warm`` is
+given. That many websocket sessions then open at once and click the same
+archived report, optionally over a custom date range. This is what happens
+when several managers open the dashboard right after an export. The latency
+from the click to the end of each session's script run is reported, along with
+any exceptions the app showed.
+
+Speaks Streamlit's browser protocol with the ``websockets`` package, which is
+installed alongside Streamlit's server.
+
+Usage: python benchmarks/load_test.py [--sessions 1 4 8] [--report "May 2023"]
+                                      [--custom-range] [--warm]
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from contextlib import ExitStack
+from pathlib import Path
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from websockets.sync.client import connect
+
+ROOT = Path(__file__).resolve().parents[1]
+CUSTOM_RANGE_LABEL = "Enable Custom Date Range"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port, cache_dir, timeout=60):
+    env = {**os.environ, "COE_KPI_CACHE_DIR": str(cache_dir)}
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "streamlit",
+            "run",
+            str(ROOT / "streamlit_app.py"),
+            "--server.headless=true",
+            f"--server.port={port}",
+            "--browser.gatherUsageStats=false",
+        ],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health"):
+                return server
+        except OSError:
+            time.sleep(0.25)
+    server.kill()
+    raise RuntimeError(f"streamlit did not start on port {port}")
+
+
+def open_stream(port):
+    return connect(
+        f"ws://127.0.0.1:{port}/_stcore/stream",
+        subprotocols=["streamlit"],
+        max_size=None,
+        open_timeout=30,
+    )
+
+
+class Session:
+    """One browser tab, talking to the server over websocket ``ws``."""
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.widgets = {}
+        self.exceptions = []
+
+    def run(self, widget_states=()):
+        """Rerun the script with ``widget_states``; return the seconds it took."""
+        message = BackMsg()
+        message.rerun_script.query_string = ""
+        message.rerun_script.widget_states.widgets.extend(widget_states)
+        start = time.perf_counter()
+        self.ws.send(message.SerializeToString())
+        while True:
+            forward = ForwardMsg()
+            forward.ParseFromString(self.ws.recv())
+            kind = forward.WhichOneof("type")
+            if kind == "script_finished":
+                return time.perf_counter() - start
+            if kind == "delta" and forward.delta.WhichOneof("type") == "new_element":
+                self._record(forward.delta.new_element)
+
+    def _record(self, element):
+        kind = element.WhichOneof("type")
+        if kind in ("button", "checkbox"):
+            widget = getattr(element, kind)
+            self.widgets[widget.label] = widget.id
+        elif kind == "exception":
+            self.exceptions.append(element.exception.message)
+
+    def open_report(self, label, custom_range=False):
+        states = [WidgetState(id=self.widgets[label], trigger_value=True)]
+        if custom_range:
+            states.append(
+                WidgetState(id=self.widgets[CUSTOM_RANGE_LABEL], bool_value=True)
+            )
+        return self.run(states)
+
+
+def load_round(port, sessions, report, custom_range):
+    """Open ``sessions`` sessions, then have them all click ``report`` at once."""
+    with ExitStack() as stack:
+        clients = [
+            Session(stack.enter_context(open_stream(port))) for _ in range(sessions)
+        ]
+        for client in clients:
+            client.run()
+        barrier = threading.Barrier(sessions)
+        latencies = [None] * sessions
+
+        def click(index):
+            barrier.wait()
+            latencies[index] = clients[index].open_report(report, custom_range)
+
+        threads = [threading.Thread(target=click, args=(i,)) for i in range(sessions)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - start
+    exceptions = [message for client in clients for message in client.exceptions]
+    return latencies, wall, exceptions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--report", default="May 2023")
+    parser.add_argument("--custom-range", action="store_true")
+    parser.add_argument(
+        "--warm", action="store_true", help="reuse the repository's .cache"
+    )
+    args = parser.parse_args()
+
+    print(f"{'sessions':>8} {'p50 (s)':>8} {'max (s)':>8} {'wall (s)':>9} errors")
+    for sessions in args.sessions:
+        with tempfile.TemporaryDirectory() as scratch:
+            cache_dir = ROOT / ".cache" if args.warm else Path(scratch)
+            port = free_port()
+            server = start_server(port, cache_dir)
+            try:
+                latencies, wall, exceptions = load_round(
+                    port, sessions, args.report, args.custom_range
+                )
+            finally:
+                server.terminate()
+                server.wait()
+        print(
+            f"{sessions:>8} {statistics.median(latencies):>8.2f} "
+            f"{max(latencies):>8.2f} {wall:>9.2f} {len(exceptions)}"
+        )
+        for message in sorted(set(exceptions)):
+            print(f"    exception: {message}")
+
+
+if __name__ == "__main__":
+    main()
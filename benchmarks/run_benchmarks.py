@@ -0,0 +1,167 @@
+"""Time each stage of the report pipeline on synthetic exports, headless.
+
+For every size a synthetic export is generated (and kept under the cache
+directory's ``benchmarks`` folder for later runs), then parsing (as the app
+reads exports), preprocessing, the cube (whole and streamed in chunks), each tab's aggregation, rendering and the
+high-DPI export are timed separately. Results are written as JSON so runs can
+be compared across versions.
+
+Usage: python benchmarks/run_benchmarks.py [--sizes 10000 100000 ...]
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from benchmarks.synthetic import (  # noqa: E402
+    DEFAULT_TEMPLATE,
+    EXCEL_MAX_ROWS,
+    synthesize,
+    write_export,
+)
+from coe_kpi.aggregate import build_cube  # noqa: E402
+from coe_kpi.export import EXPORT_DPI, zip_pngs  # noqa: E402
+from coe_kpi.ingest import FORMATS, read_export, stream_cube  # noqa: E402
+from coe_kpi.preprocess import preprocess_tickets  # noqa: E402
+from coe_kpi.render import FIGURE_NAMES, render_png, report_figure_makers  # noqa: E402
+from coe_kpi.snapshot import CACHE_ROOT  # noqa: E402
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+DATA_DIR = CACHE_ROOT / "benchmarks"
+
+
+def export_path(rows, fmt, seed, template):
+    path = DATA_DIR / f"tickets_{rows}_{seed}.{fmt}"
+    if not path.exists():
+        DATA_DIR.mkdir(parents=True, exist_ok=True)
+        write_export(synthesize(template, rows, seed), path)
+    return path
+
+
+def timed(stages, name, func, repeat=1):
+    """Run ``func`` ``repeat`` times, record the fastest run, return its result."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    stages[name] = round(best, 6)
+    return result
+
+
+def benchmark(path, fmt, args):
+    stages = {}
+    raw = timed(stages, "parse", lambda: read_export(path, fmt=fmt))
+    tickets = timed(stages, "preprocess", lambda: preprocess_tickets(raw), args.repeat)
+    cube = timed(stages, "aggregate.cube", lambda: build_cube(tickets), args.repeat)
+    timed(stages, "ingest.stream_cube", lambda: stream_cube(path, fmt=fmt))
+
+    makers = {}
+    for name in FIGURE_NAMES:
+        makers[name] = timed(
+            stages,
+            f"aggregate.{name}",
+            lambda: report_figure_makers(
+                cube, args.year - 4, args.year, args.month, names=[name]
+            )[name],
+            args.repeat,
+        )
+
+    if not args.skip_render:
+        for name, make_figure in makers.items():
+            timed(stages, f"render.{name}", lambda: render_png(make_figure))
+
+        pngs = {}
+        for name, make_figure in makers.items():
+            pngs[name] = timed(
+                stages,
+                f"export.{name}",
+                lambda: render_png(make_figure, dpi=EXPORT_DPI),
+            )
+        timed(stages, "export.zip", lambda: zip_pngs(pngs), args.repeat)
+
+    return {
+        "rows": len(raw),
+        "format": fmt,
+        "cube_cells": len(cube),
+        "tickets_bytes": int(tickets.memory_usage(deep=True).sum()),
+        "stages": stages,
+        "total": round(sum(stages.values()), 6),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument(
+        "--format",
+        choices=["auto", *sorted(set(FORMATS.values()))],
+        default="auto",
+        help="export format; auto uses xlsx where Excel's row limit allows, else csv",
+    )
+    parser.add_argument("--template", default=str(ROOT / DEFAULT_TEMPLATE))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--year", type=int, default=2023)
+    parser.add_argument("--month", type=int, default=6)
+    parser.add_argument("--skip-render", action="store_true")
+    parser.add_argument("--output", default=str(ROOT / "benchmark_results.json"))
+    args = parser.parse_args(argv)
+
+    template = pd.read_excel(args.template)
+    results = []
+    for rows in args.sizes:
+        fmt = args.format
+        if fmt == "auto":
+            fmt = "xlsx" if rows <= EXCEL_MAX_ROWS else "csv"
+        path = export_path(rows, fmt, args.seed, template)
+        result = benchmark(path, fmt, args)
+        results.append(result)
+        print(
+            f"{rows:>10} rows ({fmt}): "
+            + ", ".join(f"{k} {v:.3f}s" for k, v in result["stages"].items())
+        )
+
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "matplotlib": matplotlib.__version__,
+        "machine": platform.machine(),
+        "results": results,
+    }
+    Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+"""Generate synthetic Zendesk exports with the layout of ``coe_kpi_05_2023.xlsx``.
+
+Rows are resampled from a template export, so clients, products, statuses and
+resolution times keep their real joint distribution, while ticket IDs and
+requested dates are regenerated to cover the template's date range evenly.
+
+Usage: python benchmarks/synthetic.py ROWS OUTPUT.{xlsx,csv,jsonl,parquet}
+"""
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_TEMPLATE = "coe_kpi_05_2023.xlsx"
+
+# One row is kept for the header.
+EXCEL_MAX_ROWS = 1_048_575
+
+REQUESTED_DATE = "Requested date"
+UPDATED_DATE = "Ticket updated - Date"
+
+
+def synthesize(template, rows, seed=0):
+    """Return ``rows`` synthetic tickets with the same columns as ``template``."""
+    rng = np.random.default_rng(seed)
+    df = template.iloc[rng.integers(0, len(template), size=rows)].reset_index(drop=True)
+
+    requested = pd.to_datetime(template[REQUESTED_DATE])
+    updated = pd.to_datetime(template[UPDATED_DATE])
+    days_active = (updated - requested).to_numpy()[
+        rng.integers(0, len(template), size=rows)
+    ]
+    start = requested.min().to_datetime64()
+    span_days = (requested.max() - requested.min()).days + 1
+    new_requested = start + rng.integers(0, span_days, size=rows).astype(
+        "timedelta64[D]"
+    )
+
+    df[df.columns[0]] = np.arange(1, rows + 1)
+    df[REQUESTED_DATE] = pd.Series(new_requested).dt.strftime("%Y-%m-%d")
+    df[UPDATED_DATE] = pd.Series(new_requested + days_active).dt.strftime("%Y-%m-%d")
+    return df
+
+
+def write_export(df, path):
+    """Write ``df`` in the format implied by ``path``'s suffix."""
+    path = str(path)
+    if path.endswith(".xlsx"):
+        if len(df) > EXCEL_MAX_ROWS:
+            raise ValueError(f"Excel sheets hold at most {EXCEL_MAX_ROWS} rows")
+        df.to_excel(path, index=False)
+    elif path.endswith(".csv"):
+        df.to_csv(path, index=False)
+    elif path.endswith(".jsonl"):
+        df.to_json(path, orient="records", lines=True)
+    elif path.endswith(".parquet"):
+        df.to_parquet(path, index=False)
+    else:
+        raise ValueError(f"Unsupported export format: {path}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("rows", type=int)
+    parser.add_argument("output")
+    parser.add_argument("--template", default=DEFAULT_TEMPLATE)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    template = pd.read_excel(args.template)
+    write_export(synthesize(template, args.rows, args.seed), args.output)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
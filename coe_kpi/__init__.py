@@ -0,0 +1 @@
+"""Data and rendering helpers behind the Enstoa COE KPI Report."""
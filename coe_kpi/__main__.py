@@ -0,0 +1,124 @@
+"""Generate report packs without the app.
+
+Usage:
+    python -m coe_kpi EXPORT [EXPORT ...] [--month YYYY-MM ...]
+                      [--months YYYY-MM:YYYY-MM] [--format zip pdf]
+                      [--output-dir DIR] [--jobs N]
+    python -m coe_kpi --archive
+
+Each export is reported as of every requested month (by default the month of
+its latest ticket, as the app dates uploads). ``--archive`` runs every report
+in the archive manifest.
+"""
+import argparse
+import sys
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+from coe_kpi.batch import ReportJob, load_export_cube, run_batch  # noqa: E402
+from coe_kpi.export import EXPORT_DPI, EXPORTERS  # noqa: E402
+from coe_kpi.months import key_month, key_year, month_key  # noqa: E402
+from coe_kpi.report import ReportPeriod  # noqa: E402
+
+
+def parse_month(text):
+    """The month key of "YYYY-MM"."""
+    try:
+        year, month = (int(part) for part in text.split("-"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM, got {text!r}")
+    if not 1 <= month <= 12:
+        raise argparse.ArgumentTypeError(f"no month {month} in {text!r}")
+    return int(month_key(year, month))
+
+
+def parse_months(text):
+    """The month keys from "YYYY-MM:YYYY-MM", both ends included."""
+    start, _, end = text.partition(":")
+    start, end = parse_month(start), parse_month(end or start)
+    if start > end:
+        raise argparse.ArgumentTypeError(f"{text!r} ends before it starts")
+    return list(range(start, end + 1))
+
+
+def build_jobs(args):
+    jobs = []
+    if args.archive:
+        from coe_kpi.archive import ArchiveStore
+
+        jobs += [
+            ReportJob(entry.source, entry.current_year, entry.current_month)
+            for entry in ArchiveStore().entries
+        ]
+    keys = list(args.month) + [key for keys in args.months for key in keys]
+    for source in args.exports:
+        if not keys:
+            period = ReportPeriod.latest(load_export_cube(str(source))[1])
+            jobs.append(ReportJob(source, period.current_year, period.current_month))
+        for key in dict.fromkeys(keys):
+            jobs.append(ReportJob(source, int(key_year(key)), int(key_month(key))))
+    return jobs
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m coe_kpi", description=__doc__.splitlines()[0]
+    )
+    parser.add_argument("exports", nargs="*", help="Excel, CSV or JSON Lines exports")
+    parser.add_argument(
+        "--month",
+        action="append",
+        type=parse_month,
+        default=[],
+        help="report as if run in this month (YYYY-MM); repeatable",
+    )
+    parser.add_argument(
+        "--months",
+        action="append",
+        type=parse_months,
+        default=[],
+        help="report as of every month in START:END (YYYY-MM:YYYY-MM)",
+    )
+    parser.add_argument(
+        "--archive", action="store_true", help="also run every archived report"
+    )
+    parser.add_argument(
+        "--format",
+        nargs="+",
+        choices=sorted(EXPORTERS),
+        default=["zip"],
+        dest="formats",
+    )
+    parser.add_argument("--output-dir", default="reports")
+    parser.add_argument("--dpi", type=int, default=EXPORT_DPI)
+    parser.add_argument(
+        "--jobs", type=int, default=None, help="worker processes (default: cores)"
+    )
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    jobs = build_jobs(args)
+    if not jobs:
+        parser.error("give at least one export or --archive")
+
+    failed = 0
+    for result in run_batch(
+        jobs, args.output_dir, args.formats, dpi=args.dpi, workers=args.jobs
+    ):
+        if result.error:
+            failed += 1
+            print(f"{result.job.name}: failed: {result.error}", file=sys.stderr)
+        else:
+            outputs = ", ".join(str(path) for path in result.outputs)
+            print(f"{result.job.name}: {outputs} ({result.seconds:.1f}s)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
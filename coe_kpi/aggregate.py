@@ -0,0 +1,183 @@
+"""Single-pass aggregation of the ticket frame into a reporting cube.
+
+Every tab of the report is a slice of one ``(year, month, product, client,
+status)`` cube built with a single groupby, so the cost of each tab scales with
+the number of cube cells rather than the number of tickets.
+"""
+import numpy as np
+import pandas as pd
+
+from coe_kpi.months import month_key, month_labels
+from coe_kpi.preprocess import collapse_categories
+
+CUBE_KEYS = [
+    "year_opened",
+    "month_opened",
+    "product_type",
+    "client_name",
+    "ticket_status",
+]
+CATEGORICAL_KEYS = ["product_type", "client_name", "ticket_status"]
+# Every cube cell has a date, so its calendar keys needn't be nullable.
+CALENDAR_KEY_DTYPES = {"year_opened": "int16", "month_opened": "int8"}
+CUBE_VALUES = ["ticket_count", "days_active_count", "days_active_sum"]
+
+CLIENT_ALIASES = {"The Red Sea Development Co., (TRSDC)": "TRSDC"}
+
+SECONDS_PER_DAY = 24 * 3600
+
+
+def build_cube(df):
+    """Aggregate ``df`` (see ``preprocess_tickets``) into one row per cell.
+
+    Cells carry the ticket count plus the sum and count of ``days_active`` in
+    seconds, which is enough to derive every count and mean the report shows.
+    Tickets without a requested date can't be placed in a month and are left
+    out; missing products and clients are kept as their own cells.
+    """
+    dated = df[df.requested_date.notna()].astype(CALENDAR_KEY_DTYPES)
+    return (
+        dated.assign(days_active_seconds=dated.days_active.dt.total_seconds())
+        .groupby(CUBE_KEYS, observed=True, dropna=False)
+        .agg(
+            ticket_count=("ticket_id", "size"),
+            days_active_count=("days_active_seconds", "count"),
+            days_active_sum=("days_active_seconds", "sum"),
+        )
+        .reset_index()
+    )
+
+
+def merge_cubes(cubes):
+    """Combine cubes built from disjoint sets of tickets into one.
+
+    Every cube column is a count or a sum, so cells with the same keys add up
+    to what ``build_cube`` would return for all of the tickets at once.
+    """
+    # Cubes from different chunks have different category sets.
+    as_objects = {key: object for key in CATEGORICAL_KEYS}
+    merged = pd.concat([cube.astype(as_objects) for cube in cubes], ignore_index=True)
+    return (
+        merged.groupby(CUBE_KEYS, dropna=False)[CUBE_VALUES]
+        .sum()
+        .reset_index()
+        .astype(
+            {**CALENDAR_KEY_DTYPES, **{key: "category" for key in CATEGORICAL_KEYS}}
+        )
+    )
+
+
+def monthly_counts(cube):
+    """Tickets opened per (year, month)."""
+    return (
+        cube.groupby(by=["year_opened", "month_opened"])
+        .ticket_count.sum()
+        .reset_index(name="ticket_count")
+        .astype({"month_opened": "int32"})
+    )
+
+
+def monthly_close_times(cube, start_year):
+    """Mean days to close per (year, month) for closed tickets since ``start_year``."""
+    closed = cube[(cube.ticket_status == "Closed") & (cube.year_opened >= start_year)]
+    return _mean_days_active(closed, ["year_opened", "month_opened"])
+
+
+def top_products(cube, since_year=2022, limit=6):
+    """The busiest products since ``since_year``, with "Other" always last."""
+    recent = cube[(cube.year_opened >= since_year) & cube.product_type.notna()]
+    return leading_products(_ranked(recent, "product_type"), limit)
+
+
+def top_clients(cube, since_year=2022, limit=5):
+    """The busiest clients since ``since_year`` followed by "Other"."""
+    recent = with_client_aliases(cube[cube.year_opened >= since_year])
+    return leading_clients(_ranked(recent, "client_name"), limit)
+
+
+def rank_counts(counts):
+    """Nonzero ``counts`` from most to fewest tickets, ties in index order."""
+    return counts.loc[counts > 0].sort_values(ascending=False, kind="stable")
+
+
+def leading_products(ranked, limit=6):
+    """The first ``limit`` products of ``ranked`` (see ``rank_counts``), "Other" last."""
+    products = list(ranked.index[:limit])
+
+    if "Other" in products:
+        products.remove("Other")
+    products.append("Other")
+    return products
+
+
+def leading_clients(ranked, limit=5):
+    """The first ``limit`` clients of ``ranked`` (see ``rank_counts``) and "Other"."""
+    return list(ranked.index[:limit]) + ["Other"]
+
+
+def with_client_aliases(cells):
+    """``cells`` with clients known under several names merged under one."""
+    return cells.assign(
+        client_name=cells.client_name.astype(object).replace(CLIENT_ALIASES)
+    )
+
+
+def product_counts(cube, products):
+    """Tickets per (year, month, product), bucketing unlisted products as "Other"."""
+    cells = cube[cube.product_type.notna()]
+    cells = cells.assign(product_type=collapse_categories(cells.product_type, products))
+    counts = (
+        cells.groupby(by=["year_opened", "month_opened", "product_type"], observed=True)
+        .ticket_count.sum()
+        .reset_index(name="count")
+    )
+    return _with_month_labels(counts)
+
+
+def client_counts(cube, clients):
+    """Tickets per (year, month, client), bucketing unlisted clients as "Other"."""
+    cells = with_client_aliases(cube)
+    cells = cells.assign(client_name=collapse_categories(cells.client_name, clients))
+    counts = (
+        cells.groupby(by=["year_opened", "month_opened", "client_name"], observed=True)
+        .ticket_count.sum()
+        .reset_index(name="count")
+    )
+    return _with_month_labels(counts)
+
+
+def product_close_times(cube, products):
+    """Mean days to close per (year, month, product) for closed tickets."""
+    closed = cube[(cube.ticket_status == "Closed") & cube.product_type.notna()]
+    closed = closed.assign(
+        product_type=collapse_categories(closed.product_type, products)
+    )
+    return _with_month_labels(
+        _mean_days_active(closed, ["year_opened", "month_opened", "product_type"])
+    )
+
+
+def _ranked(cells, column):
+    return rank_counts(cells.groupby(column, observed=True).ticket_count.sum())
+
+
+def _mean_days_active(cells, keys):
+    totals = (
+        cells.groupby(by=keys, observed=True)[["days_active_sum", "days_active_count"]]
+        .sum()
+        .loc[lambda totals: totals.days_active_count > 0]
+    )
+    mean_seconds = totals.days_active_sum / totals.days_active_count
+
+    result = totals.index.to_frame(index=False)
+    result["average_days_active"] = pd.to_timedelta(mean_seconds.to_numpy(), unit="s")
+    result["rounded_days_active"] = np.ceil(
+        mean_seconds.to_numpy() / SECONDS_PER_DAY
+    ).astype(int)
+    return result
+
+
+def _with_month_labels(frame):
+    frame["month_key"] = month_key(frame.year_opened, frame.month_opened)
+    frame["month_year_style"] = month_labels(frame.month_key)
+    return frame
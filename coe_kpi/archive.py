@@ -0,0 +1,170 @@
+"""Published monthly reports, materialized once and then only read.
+
+``archive/index.json`` lists the published reports: the sidebar label, the
+export each was run on and the month it was run in. The first time a report is
+opened its cube, per-chart aggregates, top products and clients and close-time
+sketch (see ``coe_kpi.sketch``) are written under ``.cache/archive``, and each
+chart is stored the first time it is drawn.
+After that, opening an archived report only reads files.
+
+``python -m coe_kpi.archive`` materializes every archived report ahead of time.
+"""
+import json
+import os
+import shutil
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+import pandas as pd
+
+from coe_kpi.aggregate import build_cube, top_clients, top_products
+from coe_kpi.ingest import read_export
+from coe_kpi.preprocess import preprocess_tickets
+from coe_kpi.render import FIGURE_NAMES, figure_maker, render_png, report_aggregates
+from coe_kpi.sketch import build_sketch
+from coe_kpi.snapshot import CACHE_ROOT, file_digest
+
+MANIFEST_PATH = Path(__file__).resolve().parents[1] / "archive" / "index.json"
+DEFAULT_ARCHIVE_DIR = CACHE_ROOT / "archive"
+
+# Bump when the payload layout or the report's aggregates change, so stale
+# payloads are rebuilt instead of read.
+PAYLOAD_VERSION = 5
+
+
+@dataclass
+class ArchiveEntry:
+    """One published report, as listed in the manifest."""
+
+    id: str
+    label: str
+    source: Path
+    current_year: int
+    current_month: int
+
+
+@dataclass
+class ArchivedReport:
+    """The materialized data behind an archived report."""
+
+    entry: ArchiveEntry
+    digest: str
+    directory: Path
+    primary_year: int
+    products: list
+    clients: list
+    cube: pd.DataFrame
+    aggregates: dict
+    close_time_sketch: pd.DataFrame
+
+    def figure_maker(self, name):
+        return figure_maker(
+            name,
+            self.aggregates[name],
+            self.products,
+            self.clients,
+            self.primary_year,
+            self.entry.current_year,
+            self.entry.current_month,
+        )
+
+
+class ArchiveStore:
+    """Archived reports listed in ``manifest``, materialized under ``directory``.
+
+    Export paths in the manifest are relative to the manifest's parent
+    directory's parent (the repository root).
+    """
+
+    def __init__(self, manifest=MANIFEST_PATH, directory=DEFAULT_ARCHIVE_DIR):
+        manifest = Path(manifest)
+        self.directory = Path(directory)
+        root = manifest.parent.parent
+        self.entries = [
+            ArchiveEntry(**{**entry, "source": root / entry["source"]})
+            for entry in json.loads(manifest.read_text())["archives"]
+        ]
+
+    def get(self, archive_id):
+        return next((entry for entry in self.entries if entry.id == archive_id), None)
+
+    def open(self, entry):
+        """Read ``entry``'s payload, materializing it on first use."""
+        digest = file_digest(entry.source)
+        directory = self.directory / f"{entry.id}-{digest[:16]}-v{PAYLOAD_VERSION}"
+        if not (directory / "meta.json").exists():
+            self._materialize(entry, directory)
+
+        meta = json.loads((directory / "meta.json").read_text())
+        return ArchivedReport(
+            entry=entry,
+            digest=digest,
+            directory=directory,
+            primary_year=meta["primary_year"],
+            products=meta["products"],
+            clients=meta["clients"],
+            cube=pd.read_parquet(directory / "cube.parquet"),
+            aggregates={
+                name: pd.read_parquet(directory / f"{name}.parquet")
+                for name in FIGURE_NAMES
+            },
+            close_time_sketch=pd.read_parquet(directory / "sketch.parquet"),
+        )
+
+    def figure_png(self, report, name, dpi=200):
+        """Return chart ``name`` of ``report`` as PNG bytes, drawing it only once."""
+        path = report.directory / f"{name}-{dpi}.png"
+        if path.exists():
+            return path.read_bytes()
+        png = render_png(report.figure_maker(name), dpi=dpi)
+        tmp_path = path.with_suffix(f".{_scratch_suffix()}")
+        tmp_path.write_bytes(png)
+        os.replace(tmp_path, path)
+        return png
+
+    def materialize_all(self, dpi=200):
+        for entry in self.entries:
+            report = self.open(entry)
+            for name in FIGURE_NAMES:
+                self.figure_png(report, name, dpi=dpi)
+
+    def _materialize(self, entry, directory):
+        tickets = preprocess_tickets(read_export(entry.source))
+        cube = build_cube(tickets)
+        primary_year = entry.current_year - 4
+        products = top_products(cube)
+        clients = top_clients(cube)
+        aggregates = report_aggregates(cube, primary_year, products, clients)
+
+        # Build in a scratch directory and rename it into place, so readers
+        # never see a partial payload. Scratch names are per thread, as
+        # sessions share the process.
+        tmp_directory = directory.with_name(f"{directory.name}.{_scratch_suffix()}")
+        tmp_directory.mkdir(parents=True, exist_ok=True)
+        cube.to_parquet(tmp_directory / "cube.parquet")
+        build_sketch(tickets).to_parquet(tmp_directory / "sketch.parquet")
+        for name, frame in aggregates.items():
+            frame.to_parquet(tmp_directory / f"{name}.parquet")
+        (tmp_directory / "meta.json").write_text(
+            json.dumps(
+                {
+                    "primary_year": primary_year,
+                    "products": products,
+                    "clients": clients,
+                }
+            )
+        )
+        try:
+            os.replace(tmp_directory, directory)
+        except OSError:
+            # Another process materialized it first.
+            shutil.rmtree(tmp_directory, ignore_errors=True)
+
+
+def _scratch_suffix():
+    return f"{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+if __name__ == "__main__":
+    ArchiveStore().materialize_all()
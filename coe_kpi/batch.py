@@ -0,0 +1,133 @@
+"""Headless report runs, for the monthly pack and for backfills.
+
+A batch is a list of ``ReportJob``s, each an export and the month the report is
+run in. A job draws the app's five figures (see ``coe_kpi.report``) from the
+export's cube, cut off at that month, and writes them as a zip of PNGs and/or
+a PDF. Jobs are independent, so a batch spreads them over a pool of processes.
+Each worker keeps the cubes it has loaded, so the months of one export share
+one parse.
+
+``python -m coe_kpi`` is the command-line entry point.
+"""
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+
+from coe_kpi.aggregate import build_cube
+from coe_kpi.export import EXPORT_DPI, EXPORTERS
+from coe_kpi.figure_cache import DEFAULT_DISK_DIR, FigureCache
+from coe_kpi.ingest import STREAMING_MIN_BYTES, export_size, stream_cube
+from coe_kpi.months import month_key
+from coe_kpi.preprocess import preprocess_tickets
+from coe_kpi.render import render_cached
+from coe_kpi.report import ReportEngine, ReportPeriod
+from coe_kpi.snapshot import SnapshotCache, file_digest
+
+
+@dataclass
+class ReportJob:
+    """The report on ``source`` as if run in ``current_month`` of ``current_year``."""
+
+    source: Path
+    current_year: int
+    current_month: int
+
+    @property
+    def name(self):
+        return f"{Path(self.source).stem}_report_{self.current_year:04d}-{self.current_month:02d}"
+
+
+@dataclass
+class ReportResult:
+    job: ReportJob
+    outputs: list = field(default_factory=list)
+    seconds: float = 0.0
+    error: str = None
+
+
+@lru_cache(maxsize=4)
+def load_export_cube(source):
+    """The digest and cube of export ``source``, as the app would load them."""
+    digest = file_digest(source)
+    if export_size(source) >= STREAMING_MIN_BYTES:
+        return digest, stream_cube(source)
+    tickets = preprocess_tickets(SnapshotCache().load(source, digest=digest))
+    return digest, build_cube(tickets)
+
+
+def run_job(job, output_dir, formats=("zip",), dpi=EXPORT_DPI, figure_cache=None):
+    """Render ``job``'s figures and write one file per format; return the paths."""
+    digest, cube = load_export_cube(str(job.source))
+    # Later months of a cumulative export didn't exist when the report ran.
+    through = int(month_key(job.current_year, job.current_month))
+    cube = cube[month_key(cube.year_opened, cube.month_opened) <= through]
+
+    engine = ReportEngine(
+        cube, ReportPeriod(job.current_year, job.current_month), digest
+    )
+    pngs = render_cached(
+        engine.figure_makers(),
+        figure_cache or FigureCache(),
+        dpi=dpi,
+        through=through,
+        **engine.render_params,
+    )
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    outputs = []
+    for fmt in formats:
+        path = output_dir / f"{job.name}.{fmt}"
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_bytes(EXPORTERS[fmt](pngs, dpi=dpi))
+        os.replace(tmp_path, path)
+        outputs.append(path)
+    return outputs
+
+
+def _run_job(job, output_dir, formats, dpi):
+    # Runs in a pool worker; errors come back as results so one bad export
+    # doesn't abort the batch.
+    start = time.perf_counter()
+    try:
+        outputs = run_job(
+            job,
+            output_dir,
+            formats,
+            dpi,
+            figure_cache=_worker_figure_cache(),
+        )
+    except Exception as err:
+        return ReportResult(job, seconds=time.perf_counter() - start, error=repr(err))
+    return ReportResult(job, outputs, time.perf_counter() - start)
+
+
+@lru_cache(maxsize=1)
+def _worker_figure_cache():
+    return FigureCache(directory=DEFAULT_DISK_DIR)
+
+
+def run_batch(jobs, output_dir, formats=("zip",), dpi=EXPORT_DPI, workers=None):
+    """Run ``jobs``, yielding a ``ReportResult`` for each as it finishes.
+
+    With more than one job and core, jobs run in ``workers`` spawned processes
+    (default: one per core). Jobs on the same export are submitted together so
+    a worker is likely to reuse a cube it already loaded.
+    """
+    jobs = sorted(jobs, key=lambda job: str(job.source))
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers < 2:
+        for job in jobs:
+            yield _run_job(job, output_dir, formats, dpi)
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    ) as pool:
+        futures = [pool.submit(_run_job, job, output_dir, formats, dpi) for job in jobs]
+        for future in as_completed(futures):
+            yield future.result()
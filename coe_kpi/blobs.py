@@ -0,0 +1,115 @@
+"""Content-addressed storage of uploaded exports.
+
+People upload the same export again and again. ``BlobStore.put`` copies an
+upload to disk in chunks and hashes the chunks as they are copied. The copy is
+kept under the SHA-256 of its bytes, so identical uploads from any session,
+before or after a restart, share one file. Everything derived from an export
+is keyed by that digest: its snapshot, cube, aggregates and figures.
+
+Each ``Blob`` returned by the store is a reference. A blob is pinned while any
+handle to it is alive, for example in a session's state or a running job.
+Least-recently-used eviction keeps the store under ``max_bytes`` and never
+deletes a pinned blob.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+import weakref
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+
+from coe_kpi.ingest import export_format
+from coe_kpi.snapshot import CACHE_ROOT, evict_least_recently_used
+
+DEFAULT_BLOB_DIR = CACHE_ROOT / "blobs"
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass(eq=False)
+class Blob:
+    """A reference to a stored export; the blob stays pinned while this lives."""
+
+    digest: str
+    path: Path
+
+
+class BlobStore:
+    """Export files named by the SHA-256 of their bytes, with reference counts.
+
+    A blob's file is ``<digest>.<format>``, so the format guessed from the
+    upload's name survives.
+    """
+
+    def __init__(self, directory=DEFAULT_BLOB_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._refs = Counter()
+        self._lock = threading.Lock()
+
+    def put(self, file, chunk_size=CHUNK_SIZE):
+        """Store an uploaded file in one streaming pass; return a ``Blob``."""
+        fmt = export_format(file)
+        sha256 = hashlib.sha256()
+        incoming = self.directory / "incoming"
+        incoming.mkdir(parents=True, exist_ok=True)
+        file.seek(0)
+        with tempfile.NamedTemporaryFile(dir=incoming, delete=False) as scratch:
+            try:
+                for chunk in iter(lambda: file.read(chunk_size), b""):
+                    sha256.update(chunk)
+                    scratch.write(chunk)
+            except BaseException:
+                os.unlink(scratch.name)
+                raise
+        file.seek(0)
+
+        # Referenced first, so a concurrent eviction can't remove it.
+        digest = sha256.hexdigest()
+        blob = self._reference(digest, self.path_for(digest, fmt))
+        if blob.path.exists():
+            # Already uploaded; only refresh its place in the eviction order.
+            os.unlink(scratch.name)
+            os.utime(blob.path)
+        else:
+            os.replace(scratch.name, blob.path)
+        self.evict()
+        return blob
+
+    def get(self, digest):
+        """A new ``Blob`` for ``digest``, or None if it isn't stored."""
+        for path in self.directory.glob(f"{digest}.*"):
+            os.utime(path)
+            return self._reference(digest, path)
+        return None
+
+    def path_for(self, digest, fmt):
+        return self.directory / f"{digest}.{fmt}"
+
+    def refcount(self, digest):
+        with self._lock:
+            return self._refs[digest]
+
+    def evict(self):
+        with self._lock:
+            pinned = {
+                path
+                for digest in self._refs
+                for path in self.directory.glob(f"{digest}.*")
+            }
+        evict_least_recently_used(self.directory, "*.*", self.max_bytes, keep=pinned)
+
+    def _reference(self, digest, path):
+        blob = Blob(digest, path)
+        with self._lock:
+            self._refs[digest] += 1
+        weakref.finalize(blob, self._release, digest)
+        return blob
+
+    def _release(self, digest):
+        with self._lock:
+            self._refs[digest] -= 1
+            if self._refs[digest] <= 0:
+                del self._refs[digest]
@@ -0,0 +1,277 @@
+"""Interactive (Vega-Lite) versions of the five report figures.
+
+Each function mirrors its ``coe_kpi.figures`` counterpart. It takes the same
+aggregate frame and returns an Altair chart, so the browser handles hover and
+zoom without a rerun. Only the rows and columns a chart plots are embedded,
+which is a few hundred rows at most, never tickets. Charts are built with the
+Altair 5 API (``selection_point``/``selection_interval`` and ``add_params``).
+"""
+import altair as alt
+
+from coe_kpi.figures import PALETTE, bar_window, line_title_years
+from coe_kpi.months import month_key
+from coe_kpi.stats import CHART_VARIANTS, STATISTICS
+
+MONTH_NAMES_EXPR = (
+    "['January', 'February', 'March', 'April', 'May', 'June', 'July', "
+    "'August', 'September', 'October', 'November', 'December'][datum.value - 1]"
+)
+
+
+def tickets_per_month_chart(
+    monthly, primary_year, current_year, current_month, palette=PALETTE, start_key=None
+):
+    """Fig 1: Tickets per month, one line per year, completed months only."""
+    title_years = line_title_years(start_key, current_year, current_month)
+    if start_key is None:
+        start_key = month_key(primary_year, 1)
+    keys = month_key(monthly.year_opened, monthly.month_opened)
+    source = monthly[
+        (keys >= start_key) & (keys < month_key(current_year, current_month))
+    ]
+    return _yearly_line_chart(
+        source,
+        y="ticket_count",
+        y_title="Tickets Opened",
+        current_month=current_month,
+        palette=palette,
+        title=f"Number of Zendesk Tickets Opened per Month {title_years}",
+    )
+
+
+def close_times_chart(
+    close_times,
+    current_year,
+    current_month,
+    palette=PALETTE,
+    start_key=None,
+    statistic="mean",
+):
+    """Fig 2: Days to close tickets per month as ``statistic``, one line per year."""
+    statistic = STATISTICS[statistic]
+    title_years = line_title_years(start_key, current_year, current_month)
+    return _yearly_line_chart(
+        close_times,
+        y=statistic.column,
+        y_title=f"{statistic.axis} Days to Ticket Closure",
+        current_month=current_month,
+        palette=palette,
+        title=f"{statistic.title} Number of Days to Close Tickets per Month {title_years}",
+    )
+
+
+def product_counts_chart(
+    product_counts,
+    products,
+    current_year,
+    current_month,
+    palette=PALETTE,
+    start_key=None,
+):
+    """Fig 3: Tickets per month by product."""
+    return _monthly_bar_chart(
+        product_counts,
+        y="count",
+        hue="product_type",
+        hue_order=products,
+        current_year=current_year,
+        current_month=current_month,
+        palette=palette,
+        start_key=start_key,
+        y_title="Count of Tickets",
+        hue_title="Product",
+        title="Number of Tickets per Month by Product",
+    )
+
+
+def client_counts_chart(
+    client_counts, clients, current_year, current_month, palette=PALETTE, start_key=None
+):
+    """Fig 4: Tickets per month by client."""
+    return _monthly_bar_chart(
+        client_counts,
+        y="count",
+        hue="client_name",
+        hue_order=clients,
+        current_year=current_year,
+        current_month=current_month,
+        palette=palette,
+        start_key=start_key,
+        y_title="Count of Tickets",
+        hue_title="Client",
+        title="Number of Tickets per Month by Client",
+    )
+
+
+def product_close_times_chart(
+    product_close_times,
+    products,
+    current_year,
+    current_month,
+    palette=PALETTE,
+    start_key=None,
+    statistic="mean",
+):
+    """Fig 5: Days to close tickets per month by product, as ``statistic``."""
+    statistic = STATISTICS[statistic]
+    return _monthly_bar_chart(
+        product_close_times,
+        y=statistic.column,
+        hue="product_type",
+        hue_order=products,
+        current_year=current_year,
+        current_month=current_month,
+        palette=palette,
+        start_key=start_key,
+        y_title=f"{statistic.axis} Days to Ticket Closure",
+        hue_title="Product",
+        title=f"{statistic.title} Number of Days to Close Tickets each Month by Product",
+    )
+
+
+def report_chart(
+    name,
+    frame,
+    products,
+    clients,
+    primary_year,
+    current_year,
+    current_month,
+    start_key=None,
+):
+    """The interactive chart ``name``; arguments as for ``render.figure_maker``."""
+    name, statistic = CHART_VARIANTS.get(name, (name, None))
+    if name == "tickets_per_month":
+        return tickets_per_month_chart(
+            frame, primary_year, current_year, current_month, start_key=start_key
+        )
+    if name == "average_days_to_close":
+        return close_times_chart(
+            frame,
+            current_year,
+            current_month,
+            start_key=start_key,
+            statistic=statistic,
+        )
+    if name == "average_days_by_product":
+        return product_close_times_chart(
+            frame,
+            products,
+            current_year,
+            current_month,
+            start_key=start_key,
+            statistic=statistic,
+        )
+    draw, members = {
+        "count_product_tickets": (product_counts_chart, products),
+        "count_client_tickets": (client_counts_chart, clients),
+    }[name]
+    return draw(frame, members, current_year, current_month, start_key=start_key)
+
+
+def _yearly_line_chart(data, y, y_title, current_month, palette, title):
+    source = data[["year_opened", "month_opened", y]].astype(
+        {"year_opened": int, "month_opened": int}
+    )
+    hover = alt.selection_point(
+        on="pointerover", fields=["month_opened"], nearest=True, empty=False
+    )
+    zoom = alt.selection_interval(bind="scales")
+
+    x = alt.X(
+        "month_opened:Q",
+        title=None,
+        scale=alt.Scale(domain=[1, 12]),
+        axis=alt.Axis(values=list(range(1, 13)), labelExpr=MONTH_NAMES_EXPR),
+    )
+    color = alt.Color(
+        "year_opened:N",
+        title="Year",
+        scale=alt.Scale(range=palette[:5]),
+        legend=alt.Legend(orient="right"),
+        sort="descending",
+    )
+    tooltip = [
+        alt.Tooltip("year_opened:N", title="Year"),
+        alt.Tooltip("month_opened:Q", title="Month"),
+        alt.Tooltip(f"{y}:Q", title=y_title),
+    ]
+    base = alt.Chart().encode(x=x)
+
+    lines = base.mark_line(strokeWidth=3).encode(
+        y=alt.Y(f"{y}:Q", title=y_title), color=color
+    )
+    points = (
+        base.mark_point(filled=True, size=60)
+        .encode(
+            y=f"{y}:Q",
+            color=color,
+            opacity=alt.condition(hover, alt.value(1), alt.value(0)),
+            tooltip=tooltip,
+        )
+        .add_params(hover)
+    )
+    rule = base.mark_rule(color="gray").transform_filter(hover)
+    layers = [lines.add_params(zoom), points, rule]
+    if current_month != 1:
+        layers.append(
+            alt.Chart()
+            .mark_rule(color="red", strokeDash=[6, 4])
+            .encode(x=alt.datum(current_month - 0.5))
+        )
+    return alt.layer(*layers, data=source).properties(title=title, height=600)
+
+
+def _monthly_bar_chart(
+    data,
+    y,
+    hue,
+    hue_order,
+    current_year,
+    current_month,
+    palette,
+    start_key,
+    y_title,
+    hue_title,
+    title,
+):
+    start_key, title_range = bar_window(start_key, current_year, current_month)
+    source = data[
+        (data.month_key >= start_key)
+        & (data.month_key < month_key(current_year, current_month))
+        & data[hue].isin(hue_order)
+    ][["month_key", "month_year_style", hue, y]].astype(
+        {hue: str, "month_year_style": str, "month_key": int}
+    )
+    highlight = alt.selection_point(fields=[hue], bind="legend")
+    zoom = alt.selection_interval(bind="scales", encodings=["y"])
+
+    return (
+        alt.Chart(source)
+        .mark_bar()
+        .encode(
+            x=alt.X(
+                "month_year_style:O",
+                title=None,
+                sort=alt.EncodingSortField(field="month_key", op="min"),
+                axis=alt.Axis(labelAngle=0),
+            ),
+            xOffset=alt.XOffset(f"{hue}:N", sort=list(hue_order)),
+            y=alt.Y(f"{y}:Q", title=y_title),
+            color=alt.Color(
+                f"{hue}:N",
+                title=hue_title,
+                sort=list(hue_order),
+                scale=alt.Scale(domain=list(hue_order), range=palette),
+                legend=alt.Legend(orient="top", columns=len(hue_order)),
+            ),
+            opacity=alt.condition(highlight, alt.value(1), alt.value(0.2)),
+            tooltip=[
+                alt.Tooltip("month_year_style:N", title="Month"),
+                alt.Tooltip(f"{hue}:N", title=hue_title),
+                alt.Tooltip(f"{y}:Q", title=y_title),
+            ],
+        )
+        .add_params(highlight, zoom)
+        .properties(title=f"{title} {title_range}", height=550)
+    )
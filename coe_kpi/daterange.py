@@ -0,0 +1,89 @@
+"""Totals and slices of the report over an arbitrary range of months.
+
+A range is an inclusive pair of month keys (see ``coe_kpi.months``). Moving it
+never regroups tickets. ``MonthlyTotals`` lays the cube out densely by month
+with running totals along the month axis, so any range's totals are one
+subtraction. ``slice_months`` cuts the month-sorted chart aggregates with
+binary search.
+"""
+import numpy as np
+import pandas as pd
+
+from coe_kpi.aggregate import (
+    leading_clients,
+    leading_products,
+    rank_counts,
+    with_client_aliases,
+)
+from coe_kpi.months import month_key
+
+
+class MonthlyTotals:
+    """Running totals of cube ``values`` by month, per ``dimension`` member.
+
+    Without a ``dimension``, a single member ("All") totals every cell.
+    """
+
+    def __init__(self, cube, dimension=None, values=("ticket_count",)):
+        if dimension is None:
+            cells = cube
+            codes, self.members = np.zeros(len(cube), dtype=int), pd.Index(["All"])
+        else:
+            cells = cube[cube[dimension].notna()]
+            codes, self.members = pd.factorize(
+                cells[dimension].astype(object), sort=True
+            )
+        keys = month_key(cells.year_opened, cells.month_opened)
+        self.values = list(values)
+        self.first_key = int(keys.min()) if len(cells) else 0
+        n_months = int(keys.max()) - self.first_key + 1 if len(cells) else 0
+
+        # Row i holds the totals of the months before first_key + i.
+        totals = np.zeros((n_months + 1, len(self.members), len(self.values)))
+        np.add.at(
+            totals,
+            (keys - self.first_key + 1, codes),
+            cells[self.values].to_numpy(dtype=float),
+        )
+        self.cumulative = totals.cumsum(axis=0)
+
+    def totals(self, start_key, end_key):
+        """Per-member totals over months ``start_key`` to ``end_key`` inclusive."""
+        last = len(self.cumulative) - 1
+        lo = min(max(start_key - self.first_key, 0), last)
+        hi = min(max(end_key - self.first_key + 1, 0), last)
+        return pd.DataFrame(
+            self.cumulative[max(hi, lo)] - self.cumulative[lo],
+            index=self.members,
+            columns=self.values,
+        )
+
+
+class ReportRange:
+    """Range queries over one export's cube."""
+
+    def __init__(self, cube):
+        self.products = MonthlyTotals(cube, "product_type")
+        self.clients = MonthlyTotals(with_client_aliases(cube), "client_name")
+        self.tickets = MonthlyTotals(cube)
+
+    def ticket_count(self, start_key, end_key):
+        """Tickets opened in the range."""
+        return int(self.tickets.totals(start_key, end_key).ticket_count.iloc[0])
+
+    def top_products(self, start_key, end_key, limit=6):
+        """Like ``aggregate.top_products``, ranked within the range."""
+        counts = self.products.totals(start_key, end_key).ticket_count
+        return leading_products(rank_counts(counts), limit)
+
+    def top_clients(self, start_key, end_key, limit=5):
+        """Like ``aggregate.top_clients``, ranked within the range."""
+        counts = self.clients.totals(start_key, end_key).ticket_count
+        return leading_clients(rank_counts(counts), limit)
+
+
+def slice_months(frame, start_key, end_key):
+    """Rows of ``frame`` in the range; ``frame`` must be sorted by year and month."""
+    keys = month_key(frame.year_opened, frame.month_opened)
+    lo, hi = np.searchsorted(keys, [start_key, end_key + 1])
+    return frame.iloc[lo:hi]
@@ -0,0 +1,39 @@
+"""Build downloadable exports of the report in memory."""
+import io
+import zipfile
+
+import matplotlib.image as mpimg
+from matplotlib.backends.backend_pdf import PdfPages
+from matplotlib.figure import Figure
+
+EXPORT_DPI = 300
+
+
+def zip_pngs(pngs, dpi=EXPORT_DPI):
+    """Return a zip archive holding ``{name}.png`` for each ``{name: png_bytes}``.
+
+    ``dpi`` is unused, since the PNGs are stored as drawn; it is accepted so
+    every ``EXPORTERS`` entry takes the same arguments.
+    """
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zipf:
+        for name, png in pngs.items():
+            zipf.writestr(f"{name}.png", png)
+    return buffer.getvalue()
+
+
+def pdf_pngs(pngs, dpi=EXPORT_DPI):
+    """Return a PDF with one page per PNG, each page the image's size at ``dpi``."""
+    buffer = io.BytesIO()
+    with PdfPages(buffer) as pdf:
+        for png in pngs.values():
+            image = mpimg.imread(io.BytesIO(png), format="png")
+            height, width = image.shape[:2]
+            fig = Figure(figsize=(width / dpi, height / dpi), dpi=dpi)
+            fig.figimage(image)
+            pdf.savefig(fig, dpi=dpi)
+    return buffer.getvalue()
+
+
+# Format -> exporter, called as ``exporter(pngs, dpi=...)``.
+EXPORTERS = {"zip": zip_pngs, "pdf": pdf_pngs}
@@ -0,0 +1,116 @@
+"""Cache of encoded chart images keyed by data fingerprint and render options.
+
+Redrawing a chart is the most expensive part of a rerun, yet its pixels only
+depend on the export and a handful of parameters. ``FigureCache`` keeps the
+encoded PNG bytes in a size-bounded in-memory LRU, optionally backed by a
+directory so they survive restarts.
+"""
+import hashlib
+import io
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from coe_kpi.result_cache import SingleFlight
+from coe_kpi.snapshot import CACHE_ROOT, evict_least_recently_used
+
+DEFAULT_DISK_DIR = CACHE_ROOT / "figures"
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_DISK_MAX_BYTES = 256 * 1024 * 1024
+
+# Bump when ``coe_kpi.figures`` or the PNG encoding changes how a chart looks,
+# so images cached on disk by older code are drawn again instead of served.
+FIGURE_VERSION = 1
+
+
+def figure_png(fig, dpi=200):
+    """Encode ``fig`` as PNG bytes.
+
+    The defaults match what ``st.pyplot`` uses, so cached images look the same
+    as figures handed straight to Streamlit.
+    """
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", dpi=dpi, bbox_inches="tight")
+    return buffer.getvalue()
+
+
+class FigureCache:
+    """Thread-safe LRU of image bytes with an optional on-disk second tier.
+
+    ``flight`` lets concurrent renderers of one key share a single render
+    (see ``render.render_cached``, which fills the cache).
+    """
+
+    def __init__(
+        self,
+        max_bytes=DEFAULT_MAX_BYTES,
+        directory=None,
+        disk_max_bytes=DEFAULT_DISK_MAX_BYTES,
+    ):
+        self.max_bytes = max_bytes
+        self.directory = Path(directory) if directory is not None else None
+        self.disk_max_bytes = disk_max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.flight = SingleFlight()
+
+    @staticmethod
+    def key(name, **params):
+        """Build a cache key from a chart name and its JSON-serializable params."""
+        payload = json.dumps(
+            {"version": FIGURE_VERSION, "name": name, **params},
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        path = self._path_for(key)
+        if path is None or not path.exists():
+            return None
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except OSError:
+            return None
+        self._remember(key, data)
+        return data
+
+    def put(self, key, data):
+        self._remember(key, data)
+
+        path = self._path_for(key)
+        if path is None:
+            return
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            tmp_path.unlink(missing_ok=True)
+            return
+        evict_least_recently_used(self.directory, "*.png", self.disk_max_bytes)
+
+    def _remember(self, key, data):
+        with self._lock:
+            if key in self._entries:
+                self._size -= len(self._entries.pop(key))
+            self._entries[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def _path_for(self, key):
+        if self.directory is None:
+            return None
+        return self.directory / f"{key}.png"
@@ -0,0 +1,362 @@
+"""Matplotlib figures for the five report tabs.
+
+Each function takes the tab's aggregate frame (see ``coe_kpi.aggregate``) and
+returns a finished figure; nothing here touches Streamlit. Figures are built
+with the object-oriented API rather than pyplot's global state, so they can be
+drawn concurrently (see ``coe_kpi.render``).
+
+By default each chart covers the report's usual window. Passing ``start_key``
+(a ``coe_kpi.months`` key) starts it at that month instead, for custom date
+ranges; the range's end is always the month before ``current_month``.
+"""
+import calendar
+
+import seaborn as sns
+from matplotlib.figure import Figure
+
+from coe_kpi.months import key_year, month_key, month_labels
+from coe_kpi.stats import STATISTICS
+
+PALETTE = ["#264653", "#2A9D8F", "#E9C46A", "#F4A261", "#E76F51", "#E97C61"]
+
+
+def tickets_per_month_figure(
+    monthly, primary_year, current_year, current_month, palette=PALETTE, start_key=None
+):
+    """Fig 1: Tickets per month, one bar/line series per year."""
+    title_years = line_title_years(start_key, current_year, current_month)
+    if start_key is None:
+        start_key = month_key(primary_year, 1)
+    keys = month_key(monthly.year_opened, monthly.month_opened)
+
+    custom_palette = sns.color_palette(palette)
+    fig = Figure(figsize=(13.6, 7))
+    ax = fig.subplots()
+
+    sns.barplot(
+        data=monthly[keys >= start_key],
+        x="month_opened",
+        y="ticket_count",
+        hue="year_opened",
+        palette=custom_palette,
+        ax=ax,
+        errorbar=None,
+        alpha=0.2,
+    )
+
+    ax.set_xlim(-0.5, 11.5)
+    ax.set_ylim(0, ax.get_ylim()[1])
+
+    # A range without tickets draws no bars, and so no legend.
+    if ax.legend_ is not None:
+        ax.legend_.remove()
+
+    ax.set_xticklabels([calendar.month_name[i] for i in range(1, 13)])
+    ax.set_xlabel("")
+    ax.set_ylabel("Tickets Opened", fontsize=12, labelpad=15)
+    ax.tick_params(axis="both", length=0)
+    ax.tick_params(axis="y", pad=10)
+
+    ax2 = fig.add_axes([0.119, 0.11, 0.76, 0.77])  # left, bottom, width, height
+    ax2.patch.set_alpha(0)
+
+    sns.lineplot(
+        data=monthly[
+            (keys >= start_key) & (keys < month_key(current_year, current_month))
+        ],
+        x="month_opened",
+        y="ticket_count",
+        hue="year_opened",
+        palette=custom_palette[:5],
+        ax=ax2,
+        errorbar=None,
+        alpha=1,
+        legend=True,
+    )
+
+    ax2.set_xlim(0.125, 12)
+    ax2.set_ylim(0, ax.get_ylim()[1])
+
+    handles, labels = ax2.get_legend_handles_labels()
+    legend = ax2.legend(
+        handles[::-1],
+        labels[::-1],
+        facecolor="white",
+        framealpha=1,
+        bbox_to_anchor=(0.9, 0.728),
+    )
+    legend.get_title().set_fontsize(12)
+    legend.get_frame().set_linewidth(0.25)
+
+    ax2.set_xticklabels([])
+    ax2.set_yticklabels([])
+    ax2.set_xlabel("")
+    ax2.set_ylabel("")
+    ax2.tick_params(axis="both", length=0)
+
+    if current_month != 1:
+        ax2.axvline(
+            x=current_month - 0.75,
+            linestyle="--",
+            color="red",
+            ymin=0,
+            ymax=0.95,
+        )
+
+    ax2.grid(color="k", linestyle="-", axis="y", alpha=0.1)
+
+    fig.suptitle(
+        f"Number of Zendesk Tickets Opened per Month {title_years}",
+        fontsize=14,
+        ha="left",
+        va="top",
+        x=0.12,
+        y=0.93,
+    )
+
+    sns.despine(fig=fig, bottom=True, left=True)
+    return fig
+
+
+def close_times_figure(
+    close_times,
+    current_year,
+    current_month,
+    palette=PALETTE,
+    start_key=None,
+    statistic="mean",
+):
+    """Fig 2: Days to close tickets per month, one series per year.
+
+    ``statistic`` (see ``coe_kpi.stats``) picks the column drawn and the wording.
+    """
+    statistic = STATISTICS[statistic]
+    title_years = line_title_years(start_key, current_year, current_month)
+    custom_palette = sns.color_palette(palette)
+    fig = Figure(figsize=(13.6, 7))
+    ax = fig.subplots()
+
+    sns.barplot(
+        data=close_times,
+        x="month_opened",
+        y=statistic.column,
+        hue="year_opened",
+        palette=custom_palette,
+        ax=ax,
+        errorbar=None,
+        alpha=0.15,
+    )
+
+    ax.set_xlim(-0.5, 11.5)
+    ax.set_ylim(0, ax.get_ylim()[1])
+
+    # A range without tickets draws no bars, and so no legend.
+    if ax.legend_ is not None:
+        ax.legend_.remove()
+
+    ax.set_xticklabels([calendar.month_name[i] for i in range(1, 13)])
+    ax.set_xlabel("")
+    ax.set_ylabel(f"{statistic.axis} Days to Ticket Closure", fontsize=12, labelpad=15)
+    ax.tick_params(axis="both", length=0)
+    ax.tick_params(axis="y", pad=28)
+
+    ax2 = fig.add_axes([0.1, 0.11, 0.76, 0.77])  # left, bottom, width, height
+    ax2.patch.set_alpha(0)
+
+    sns.lineplot(
+        data=close_times,
+        x="month_opened",
+        y=statistic.column,
+        hue="year_opened",
+        palette=custom_palette[:5],
+        ax=ax2,
+        errorbar=None,
+        alpha=1,
+        legend=True,
+    )
+
+    ax2.set_xlim(0.125, 12)
+    ax2.set_ylim(0, ax.get_ylim()[1])
+
+    handles, labels = ax2.get_legend_handles_labels()
+    ax2.legend(
+        handles[::-1],
+        labels[::-1],
+        facecolor="white",
+        framealpha=1,
+        bbox_to_anchor=(0.9, 0.648),
+    )
+
+    ax2.set_xticklabels([])
+    ax2.set_yticklabels([])
+    ax2.set_xlabel("")
+    ax2.set_ylabel("")
+    ax2.tick_params(axis="both", length=0)
+
+    if current_month != 1:
+        ax2.axvline(
+            x=current_month - 0.45,
+            linestyle="--",
+            color="red",
+            ymin=0,
+            ymax=0.95,
+        )
+
+    ax2.grid(color="k", linestyle="-", axis="y", alpha=0.1)
+
+    fig.suptitle(
+        f"{statistic.title} Number of Days to Close Tickets per Month {title_years}",
+        fontsize=14,
+        ha="left",
+        va="top",
+        x=0.1,
+        y=0.9,
+    )
+
+    sns.despine(fig=fig, bottom=True, left=True)
+    return fig
+
+
+def product_counts_figure(
+    product_counts,
+    products,
+    current_year,
+    current_month,
+    palette=PALETTE,
+    start_key=None,
+):
+    """Fig 3: Tickets per month by product since the start of last year."""
+    return _monthly_bar_figure(
+        product_counts,
+        y="count",
+        hue="product_type",
+        hue_order=products,
+        current_year=current_year,
+        current_month=current_month,
+        palette=palette,
+        start_key=start_key,
+        ylabel="Count of Tickets",
+        title="Number of Tickets per Month by Product",
+        title_x=0.113,
+        legend_kwargs={"loc": "upper left", "bbox_to_anchor": (0.01, 1.0051)},
+    )
+
+
+def client_counts_figure(
+    client_counts, clients, current_year, current_month, palette=PALETTE, start_key=None
+):
+    """Fig 4: Tickets per month by client since the start of last year."""
+    return _monthly_bar_figure(
+        client_counts,
+        y="count",
+        hue="client_name",
+        hue_order=clients,
+        current_year=current_year,
+        current_month=current_month,
+        palette=palette,
+        start_key=start_key,
+        ylabel="Count of Tickets",
+        title="Number of Tickets per Month by Client",
+        title_x=0.1121,
+        legend_kwargs={"loc": "upper left", "bbox_to_anchor": (0.01, 1.0051)},
+    )
+
+
+def product_close_times_figure(
+    product_close_times,
+    products,
+    current_year,
+    current_month,
+    palette=PALETTE,
+    start_key=None,
+    statistic="mean",
+):
+    """Fig 5: Days to close tickets per month by product, as ``statistic``."""
+    statistic = STATISTICS[statistic]
+    return _monthly_bar_figure(
+        product_close_times,
+        y=statistic.column,
+        hue="product_type",
+        hue_order=products,
+        current_year=current_year,
+        current_month=current_month,
+        palette=palette,
+        start_key=start_key,
+        ylabel=f"{statistic.axis} days to ticket closure",
+        title=f"{statistic.title} Number of Days to Close Tickets each Month by Product",
+        title_x=0.113,
+        legend_kwargs={"loc": "upper right", "bbox_to_anchor": (0.95, 1)},
+    )
+
+
+def _monthly_bar_figure(
+    data,
+    y,
+    hue,
+    hue_order,
+    current_year,
+    current_month,
+    palette,
+    start_key,
+    ylabel,
+    title,
+    title_x,
+    legend_kwargs,
+):
+    start_key, title_range = bar_window(start_key, current_year, current_month)
+
+    fig = Figure(figsize=(30, 13))
+    ax = fig.subplots()
+
+    sns.barplot(
+        data=data[
+            (data.month_key >= start_key)
+            & (data.month_key < month_key(current_year, current_month))
+        ],
+        x="month_year_style",
+        y=y,
+        hue=hue,
+        palette=sns.color_palette(palette),
+        errorbar=None,
+        hue_order=hue_order,
+        ax=ax,
+    )
+
+    legend = ax.legend(facecolor="white", framealpha=1, fontsize=16, **legend_kwargs)
+    legend.get_frame().set_linewidth(0.25)
+
+    ax.set_xlabel("")
+    ax.set_ylabel(ylabel, fontsize=18, labelpad=18)
+    ax.set_xticklabels(ax.get_xticklabels(), fontsize=14)
+    ax.set_yticks(ax.get_yticks())
+    ax.set_yticklabels(ax.get_yticklabels(), fontsize=14)
+    ax.tick_params(axis="both", length=0)
+
+    fig.suptitle(
+        f"{title} {title_range}",
+        x=title_x,
+        y=0.93,
+        ha="left",
+        va="bottom",
+        fontsize=20,
+    )
+
+    ax.grid(color="k", linestyle="-", axis="y", alpha=0.1)
+    sns.despine(fig=fig, bottom=True, left=True)
+    return fig
+
+
+def line_title_years(start_key, current_year, current_month):
+    """The years figs 1 and 2 cover, as their titles give them."""
+    if start_key is None:
+        return f"{current_year - 4} - {current_year}"
+    end_key = month_key(current_year, current_month) - 1
+    return f"{key_year(start_key)} - {key_year(end_key)}"
+
+
+def bar_window(start_key, current_year, current_month):
+    """The first month of figs 3-5 and the range their titles give."""
+    if start_key is None:
+        return month_key(current_year - 1, 1), f"{current_year - 1} - Present"
+    end_key = month_key(current_year, current_month) - 1
+    return start_key, " - ".join(month_labels([start_key, end_key]))
@@ -0,0 +1,247 @@
+"""A persistent ticket history that monthly exports are merged into.
+
+Each monthly export is cumulative, so most of its tickets are unchanged since
+the previous month. ``TicketHistory`` keeps every ticket seen so far, keyed by
+``ticket_id``, together with the reporting cube built from them. Merging an
+export only looks at tickets that are new or were updated on or after the
+history's watermark (the latest ``ticket_updated_date`` stored), and the cube
+is corrected cell by cell: a changed ticket's old row is subtracted and its
+new row added, so months without changes are never recomputed.
+
+Tickets missing from a later export are kept: a cumulative export can't tell a
+deleted ticket from one that was filtered out. Bulk edits in Zendesk don't
+always move ``ticket_updated_date`` either (between the April and May 2023
+exports some products were renamed without it changing), so a full scan
+compares every ticket instead; the cube is still only corrected for the tickets
+that differ. ``merge`` runs one every ``FULL_SCAN_EVERY`` merges, and whenever
+the number of stored tickets missing from the export changes, which is what a
+bulk edit or deletion in Zendesk looks like. ``merge(..., full_scan=True)``
+forces one.
+
+The close-time sketch behind the quantile tabs (see ``coe_kpi.sketch``) is
+corrected the same way, by subtracting a changed ticket's old bucket and adding
+its new one.
+"""
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+import pandas as pd
+
+from coe_kpi.aggregate import CUBE_VALUES, build_cube, merge_cubes
+from coe_kpi.preprocess import CATEGORICAL_COLUMNS
+from coe_kpi.sketch import build_sketch, merge_sketches, negated
+from coe_kpi.snapshot import CACHE_ROOT
+
+DEFAULT_HISTORY_DIR = CACHE_ROOT / "history"
+FULL_SCAN_EVERY = 4
+
+
+@dataclass
+class HistoryUpdate:
+    """What merging one export changed, and the history's cube afterwards.
+
+    ``full_scan`` is False while some merge since the last full scan only
+    compared tickets past the watermark.
+    """
+
+    inserted: int
+    updated: int
+    months: list
+    cube: pd.DataFrame
+    revision: str
+    close_time_sketch: pd.DataFrame = None
+    full_scan: bool = True
+
+
+class TicketHistory:
+    """Tickets and their cube, stored as Parquet under ``directory``."""
+
+    def __init__(self, directory=DEFAULT_HISTORY_DIR):
+        self.directory = Path(directory)
+        self._lock = threading.Lock()
+        self._load()
+
+    @property
+    def revision(self):
+        """Fingerprint of the exports merged so far, for use in cache keys.
+
+        It covers how each export was merged, as a full scan can find changes
+        a watermark merge of the same export misses.
+        """
+        digest = hashlib.sha256()
+        for applied in self.state["applied"]:
+            digest.update(applied.encode())
+            if applied in self.state["full_scans"]:
+                digest.update(b"full")
+        return digest.hexdigest()
+
+    @property
+    def watermark(self):
+        watermark = self.state["watermark"]
+        return None if watermark is None else pd.Timestamp(watermark)
+
+    def merge(self, tickets, digest, full_scan=None):
+        """Upsert ``tickets`` (see ``preprocess_tickets``) from export ``digest``.
+
+        ``full_scan`` None lets the history decide (see the module docstring).
+        Merging the same export twice is a no-op, unless the second merge is a
+        full scan and the first wasn't.
+        """
+        with self._lock:
+            if digest in self.state["applied"] and (
+                not full_scan or digest in self.state["full_scans"]
+            ):
+                return self._update(0, 0, [])
+
+            incoming = tickets.drop_duplicates("ticket_id", keep="last")
+            incoming = incoming[incoming.ticket_id.notna()].set_index("ticket_id")
+            stored = self.tickets.index if self.tickets is not None else pd.Index([])
+            missing = int((~stored.isin(incoming.index)).sum())
+            if full_scan is None:
+                full_scan = (
+                    self.state["since_full_scan"] + 1 >= FULL_SCAN_EVERY
+                    or missing != self.state["missing"]
+                )
+            # The first merge compares every ticket too.
+            full_scan = full_scan or self.watermark is None
+            if not full_scan:
+                # Dates are day-precision, so tickets updated on the watermark
+                # day may have changed again since the last export.
+                incoming = incoming[
+                    (incoming.ticket_updated_date >= self.watermark)
+                    | ~incoming.index.isin(stored)
+                ]
+
+            known = incoming.index.intersection(stored)
+            previous = self.tickets.loc[known] if len(known) else incoming.iloc[:0]
+            unchanged = _same_rows(previous, incoming.loc[known])
+            previous = previous[~unchanged]
+            changed = incoming.drop(index=known[unchanged])
+
+            if len(changed):
+                cubes = [build_cube(changed.reset_index())]
+                sketches = [build_sketch(changed.reset_index())]
+                if len(previous):
+                    cubes.append(_negated(build_cube(previous.reset_index())))
+                    sketches.append(negated(build_sketch(previous.reset_index())))
+                if self.cube is not None:
+                    cubes.insert(0, self.cube)
+                    sketches.insert(0, self.close_time_sketch)
+                self.cube = (
+                    merge_cubes(cubes)
+                    .loc[lambda cube: cube.ticket_count != 0]
+                    .reset_index(drop=True)
+                )
+                kept = [changed]
+                if self.tickets is not None:
+                    kept.insert(0, self.tickets.drop(index=previous.index))
+                self.tickets = _concat_tickets(kept)
+                self.close_time_sketch = merge_sketches(sketches)
+
+            latest = tickets.ticket_updated_date.max()
+            if pd.notna(latest) and (self.watermark is None or latest > self.watermark):
+                self.state["watermark"] = latest.isoformat()
+            self.state["applied"].append(digest)
+            self.state["missing"] = missing
+            if full_scan:
+                self.state["full_scans"].append(digest)
+                self.state["since_full_scan"] = 0
+            else:
+                self.state["since_full_scan"] += 1
+            self._save()
+
+            touched = pd.concat([previous, changed])[["year_opened", "month_opened"]]
+            return self._update(
+                inserted=len(changed) - len(previous),
+                updated=len(previous),
+                months=sorted(
+                    {
+                        (int(year), int(month))
+                        for year, month in touched.dropna().itertuples(index=False)
+                    }
+                ),
+            )
+
+    def _update(self, inserted, updated, months):
+        return HistoryUpdate(
+            inserted,
+            updated,
+            months,
+            self.cube,
+            self.revision,
+            self.close_time_sketch,
+            full_scan=self.state["since_full_scan"] == 0,
+        )
+
+    def _load(self):
+        state_path = self.directory / "state.json"
+        self.state = {
+            "watermark": None,
+            "applied": [],
+            "full_scans": [],
+            "since_full_scan": 0,
+            "missing": 0,
+        }
+        self.tickets = None
+        self.cube = None
+        self.close_time_sketch = None
+        if state_path.exists():
+            self.state.update(json.loads(state_path.read_text()))
+        if (self.directory / "cube.parquet").exists():
+            self.tickets = pd.read_parquet(self.directory / "tickets.parquet")
+            self.cube = pd.read_parquet(self.directory / "cube.parquet")
+            sketch_path = self.directory / "sketch.parquet"
+            if sketch_path.exists():
+                self.close_time_sketch = pd.read_parquet(sketch_path)
+            else:
+                # Histories saved before sketches were kept.
+                self.close_time_sketch = build_sketch(self.tickets)
+
+    def _save(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # State goes last: a crash part way leaves the previous state pointing
+        # at data at least as new, and re-merging an export is harmless.
+        frames = (
+            ("tickets", self.tickets),
+            ("cube", self.cube),
+            ("sketch", self.close_time_sketch),
+        )
+        for name, frame in frames:
+            if frame is not None:
+                _replace(self.directory / f"{name}.parquet", frame.to_parquet)
+        _replace(
+            self.directory / "state.json",
+            lambda path: Path(path).write_text(json.dumps(self.state)),
+        )
+
+
+def _same_rows(previous, incoming):
+    """Boolean array: is each ``incoming`` row identical to ``previous``?"""
+    columns = previous.columns.intersection(incoming.columns)
+    # Categories differ between exports, so compare categoricals as values.
+    as_objects = {column: object for column in CATEGORICAL_COLUMNS}
+    old = previous[columns].astype(as_objects)
+    new = incoming.loc[previous.index, columns].astype(as_objects)
+    same = (old == new).fillna(False) | (old.isna() & new.isna())
+    return same.all(axis=1).to_numpy()
+
+
+def _negated(cube):
+    return cube.assign(**{value: -cube[value] for value in CUBE_VALUES})
+
+
+def _concat_tickets(frames):
+    # Frames from different exports have different category sets.
+    as_objects = {column: object for column in CATEGORICAL_COLUMNS}
+    tickets = pd.concat([frame.astype(as_objects) for frame in frames])
+    return tickets.astype({column: "category" for column in CATEGORICAL_COLUMNS})
+
+
+def _replace(path, write):
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    write(tmp_path)
+    os.replace(tmp_path, path)
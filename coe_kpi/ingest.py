@@ -0,0 +1,138 @@
+"""Read ticket exports without the columns the report drops, whole or in chunks.
+
+Every reader here skips ``DROPPED_COLUMNS`` while parsing. ``iter_export_chunks``
+yields an export a fixed number of rows at a time, using openpyxl's read-only
+row iterator for workbooks and pandas' chunked readers for CSV and JSON Lines.
+``stream_cube`` folds those chunks into the reporting cube one at a time, so
+peak memory depends on the chunk size and the number of cube cells, not on the
+size of the export. ``stream_export`` also folds each chunk's close times into
+a mergeable sketch for the quantile tabs (see ``coe_kpi.sketch``), so those stay
+bounded too.
+"""
+import os
+from itertools import islice
+from pathlib import Path
+
+import openpyxl
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+from coe_kpi.aggregate import build_cube, merge_cubes
+from coe_kpi.preprocess import DROPPED_COLUMNS, preprocess_tickets
+from coe_kpi.sketch import build_sketch, merge_sketches
+
+DEFAULT_CHUNK_ROWS = 50_000
+
+# Exports at least this big are streamed into the cube instead of being loaded
+# into a ticket frame.
+STREAMING_MIN_BYTES = 64 * 1024 * 1024
+
+FORMATS = {
+    ".xlsx": "xlsx",
+    ".xlsm": "xlsx",
+    ".csv": "csv",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+}
+
+
+def export_format(file):
+    """Guess the format of a path or uploaded file from its name (default xlsx)."""
+    name = file if isinstance(file, (str, os.PathLike)) else getattr(file, "name", "")
+    return FORMATS.get(Path(name).suffix.lower(), "xlsx")
+
+
+def export_size(file):
+    if isinstance(file, (str, os.PathLike)):
+        return os.path.getsize(file)
+    size = getattr(file, "size", None)
+    if size is None:
+        size = file.seek(0, os.SEEK_END)
+        file.seek(0)
+    return size
+
+
+def read_export(file, fmt=None):
+    """Return the whole export as a DataFrame, without ``DROPPED_COLUMNS``."""
+    fmt = fmt or export_format(file)
+    _rewind(file)
+    if fmt == "xlsx":
+        return pd.read_excel(file, usecols=_is_kept)
+    if fmt == "csv":
+        return pd.read_csv(file, usecols=_is_kept)
+    return _without_dropped(pd.read_json(file, lines=True, convert_dates=False))
+
+
+def iter_export_chunks(file, chunk_rows=DEFAULT_CHUNK_ROWS, fmt=None):
+    """Yield the export as DataFrames of at most ``chunk_rows`` rows."""
+    fmt = fmt or export_format(file)
+    _rewind(file)
+    if fmt == "xlsx":
+        yield from _iter_workbook_chunks(file, chunk_rows)
+    elif fmt == "csv":
+        with pd.read_csv(file, usecols=_is_kept, chunksize=chunk_rows) as reader:
+            yield from reader
+    else:
+        with pd.read_json(
+            file, lines=True, convert_dates=False, chunksize=chunk_rows
+        ) as reader:
+            for chunk in reader:
+                yield _without_dropped(chunk)
+
+
+def stream_cube(file, chunk_rows=DEFAULT_CHUNK_ROWS, fmt=None):
+    """Build the reporting cube (see ``build_cube``) one chunk at a time."""
+    cube = None
+    for chunk in iter_export_chunks(file, chunk_rows, fmt):
+        chunk_cube = build_cube(preprocess_tickets(chunk))
+        cube = chunk_cube if cube is None else merge_cubes([cube, chunk_cube])
+    return cube
+
+
+def stream_export(file, chunk_rows=DEFAULT_CHUNK_ROWS, fmt=None):
+    """Like ``stream_cube``, but return the cube and the export's close-time sketch."""
+    cube = sketch = None
+    for chunk in iter_export_chunks(file, chunk_rows, fmt):
+        tickets = preprocess_tickets(chunk)
+        chunk_cube = build_cube(tickets)
+        cube = chunk_cube if cube is None else merge_cubes([cube, chunk_cube])
+        chunk_sketch = build_sketch(tickets)
+        sketch = (
+            chunk_sketch if sketch is None else merge_sketches([sketch, chunk_sketch])
+        )
+    return cube, sketch
+
+
+def _iter_workbook_chunks(file, chunk_rows):
+    workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        kept = [i for i, column in enumerate(header) if _is_kept(column)]
+        while batch := list(islice(rows, chunk_rows)):
+            values = [
+                [row[i] if i < len(row) else None for i in kept]
+                for row in batch
+                if any(value not in (None, "") for value in row)
+            ]
+            if values:
+                # The parser pd.read_excel uses, for the same type inference
+                # and missing-value handling.
+                yield TextParser([[header[i] for i in kept], *values], header=0).read()
+    finally:
+        workbook.close()
+
+
+def _is_kept(column):
+    return column not in DROPPED_COLUMNS
+
+
+def _without_dropped(frame):
+    return frame.drop(columns=DROPPED_COLUMNS, errors="ignore")
+
+
+def _rewind(file):
+    if hasattr(file, "seek"):
+        file.seek(0)
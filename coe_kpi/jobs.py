@@ -0,0 +1,169 @@
+"""Background precomputation of uploaded reports.
+
+Parsing, aggregating and drawing an upload used to block the page behind a
+progress bar. ``JobRunner`` runs that work on a small thread pool instead, one
+``Job`` per report. ``precompute_report`` publishes each tab's result the
+moment it is ready, so the page can show finished tabs and poll for the rest.
+A job draws the tab the viewer wants first (``Job.want``), then the others
+together so a render pool can draw them in parallel. Submitting a report that already has a job returns that job,
+so reruns and other sessions don't start the work again.
+"""
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from coe_kpi.aggregate import build_cube
+from coe_kpi.ingest import STREAMING_MIN_BYTES, export_size, stream_export
+from coe_kpi.preprocess import preprocess_tickets
+from coe_kpi.profiling import NO_PROFILER
+from coe_kpi.render import render_cached
+from coe_kpi.report import ReportEngine, ReportPeriod
+from coe_kpi.sketch import build_sketch
+
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_JOBS = 16
+
+
+class Job:
+    """Results of one background computation, published as they finish.
+
+    ``profiler`` times the work's stages for the diagnostics panel, if the
+    session that started the job asked for them.
+    """
+
+    def __init__(self, key, profiler=NO_PROFILER):
+        self.key = key
+        self.state = "queued"
+        self.error = None
+        self.wanted = None
+        self.profiler = profiler
+        self._results = {}
+        self._lock = threading.Lock()
+
+    def want(self, name):
+        """Compute step ``name`` next, if it hasn't started yet."""
+        self.wanted = name
+
+    def put(self, name, value):
+        with self._lock:
+            self._results[name] = value
+
+    def get(self, name, default=None):
+        with self._lock:
+            return self._results.get(name, default)
+
+    def has(self, name):
+        with self._lock:
+            return name in self._results
+
+    @property
+    def finished(self):
+        return self.state in ("done", "failed")
+
+
+class JobRunner:
+    """Runs ``work(job)`` callables on a thread pool, one job per key.
+
+    The most recent ``max_jobs`` jobs are kept so their results can be read
+    back; older ones are forgotten.
+    """
+
+    def __init__(self, max_workers=DEFAULT_WORKERS, max_jobs=DEFAULT_MAX_JOBS):
+        self.max_jobs = max_jobs
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="coe-kpi-job"
+        )
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, key, work, profiler=NO_PROFILER):
+        """Return the job for ``key``, starting ``work`` if there is none.
+
+        A new job times its stages with ``profiler``.
+        """
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None:
+                self._jobs.move_to_end(key)
+                return job
+            job = self._jobs[key] = Job(key, profiler)
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+        self._pool.submit(self._run, job, work)
+        return job
+
+    def discard(self, key):
+        """Forget ``key``'s job so the next ``submit`` starts over."""
+        with self._lock:
+            self._jobs.pop(key, None)
+
+    def _run(self, job, work):
+        job.state = "running"
+        try:
+            work(job)
+        except Exception as err:
+            job.error = err
+            job.state = "failed"
+        else:
+            job.state = "done"
+
+
+def load_export(file, digest, snapshot_cache):
+    """An uploaded export's cube and close-time sketch."""
+    if export_size(file) >= STREAMING_MIN_BYTES:
+        return stream_export(file)
+    tickets = preprocess_tickets(snapshot_cache.load(file, digest=digest))
+    return build_cube(tickets), build_sketch(tickets)
+
+
+def precompute_report(
+    job,
+    load,
+    period,
+    digest,
+    names,
+    result_cache,
+    figure_cache,
+    pool=None,
+    draw=True,
+):
+    """Job body: load the cube, then build (and ``draw``) each tab in ``names``.
+
+    ``load()`` returns what ``load_export`` does. A ``period`` of None reports
+    on the export's latest month (see ``ReportPeriod.latest``). The job gets
+    ``engine`` once the cube is loaded. It then gets each tab's
+    ``(TabResult, png)``: the wanted tab's as soon as it is drawn, the rest's
+    once they all are. ``png`` is None if ``draw`` is off.
+    """
+    profiler = job.profiler
+    with profiler.stage("load"):
+        cube, sketch = result_cache.get_or_compute(("export", digest), load)
+    if period is None:
+        period = ReportPeriod.latest(cube)
+    # The engine outlives the job in other sessions, so it isn't profiled;
+    # the job times each tab as a whole instead.
+    engine = ReportEngine(
+        cube, period, digest, cache=result_cache, close_time_sketch=sketch
+    )
+    job.put("engine", engine)
+
+    names = list(names)
+    first = [name for name in names if name == job.wanted][:1] or names[:1]
+    for batch in (first, [name for name in names if name not in first]):
+        if not batch:
+            continue
+        results = {}
+        for name in batch:
+            with profiler.stage(f"tab.{name}"):
+                results[name] = engine.tab(name)
+        pngs = dict.fromkeys(batch)
+        if draw:
+            pngs = render_cached(
+                {name: result.figure.make for name, result in results.items()},
+                figure_cache,
+                pool=pool,
+                profiler=profiler,
+                **engine.render_params,
+            )
+        for name in batch:
+            job.put(name, (results[name], pngs[name]))
@@ -0,0 +1,88 @@
+"""Constant-time KPI lookups over monthly aggregates.
+
+The ``st.metric`` sidebars need a value for the latest month plus its change
+against the previous month and the same month a year earlier. ``KpiLookup``
+lays an aggregate out as a dense ``(month, member)`` array so those are plain
+index operations, and ``compare`` computes every delta in one vectorized step.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from coe_kpi.months import month_key
+
+
+@dataclass
+class KpiComparison:
+    """Values and percentage changes, one entry per lookup member."""
+
+    current: np.ndarray
+    previous_month: np.ndarray
+    previous_year: np.ndarray
+    month_delta: np.ndarray
+    year_delta: np.ndarray
+
+
+class KpiLookup:
+    """Dense lookup of ``value`` by (year, month[, ``dimension``]).
+
+    Without a ``dimension`` the lookup has a single member. Cells missing from
+    ``frame`` are NaN.
+    """
+
+    def __init__(self, frame, value, dimension=None, members=None):
+        self.first_year = int(frame.year_opened.min()) if len(frame) else 0
+        n_years = (
+            int(frame.year_opened.max()) - self.first_year + 1 if len(frame) else 0
+        )
+        self.members = list(members) if dimension else [value]
+        self.values = np.full((n_years * 12, len(self.members)), np.nan)
+
+        month_index = self._month_index(frame.year_opened, frame.month_opened)
+        if dimension:
+            member_index = pd.Categorical(
+                frame[dimension], categories=self.members
+            ).codes
+        else:
+            member_index = np.zeros(len(frame), dtype=int)
+        found = member_index >= 0
+        self.values[month_index[found], member_index[found]] = frame[value].to_numpy()[
+            found
+        ]
+
+    def _month_index(self, year, month):
+        return month_key(year, month) - month_key(self.first_year, 1)
+
+    def at(self, year, month):
+        """Values for every member; ``month`` may run past 1-12 and wraps years."""
+        index = int(self._month_index(year, month))
+        if 0 <= index < len(self.values):
+            return self.values[index]
+        return np.full(len(self.members), np.nan)
+
+    def compare(self, year, month):
+        """Compare (year, month) with the month before and the year before."""
+        current = self.at(year, month)
+        previous_month = self.at(year, month - 1)
+        previous_year = self.at(year - 1, month)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            deltas = np.round(
+                (current - np.stack([previous_month, previous_year]))
+                / np.stack([previous_month, previous_year])
+                * 100,
+                1,
+            )
+        return KpiComparison(
+            current=current,
+            previous_month=previous_month,
+            previous_year=previous_year,
+            month_delta=deltas[0],
+            year_delta=deltas[1],
+        )
+
+
+def metric_value(value):
+    """Format a looked-up value for ``st.metric`` (counts and days are whole)."""
+    return None if np.isnan(value) else int(value)
@@ -0,0 +1,86 @@
+"""Turn a raw Zendesk export into the typed ticket frame the report runs on."""
+import pandas as pd
+
+DROPPED_COLUMNS = ["Latest Update", "Tickets", "Assignee name", "Requester name"]
+
+# Export columns (after the drop above) by position, in the order the report
+# keeps them. Zendesk has renamed headers before, so positions are used rather
+# than header text.
+COLUMN_POSITIONS = {
+    0: "ticket_id",
+    1: "client_name",
+    2: "ticket_status",
+    3: "ticket_type",
+    4: "ticket_subject",
+    5: "ticket_priority",
+    7: "environment",
+    8: "product_type",
+    6: "requested_date",
+    9: "ticket_updated_date",
+}
+
+CATEGORICAL_COLUMNS = [
+    "client_name",
+    "ticket_status",
+    "ticket_type",
+    "ticket_priority",
+    "environment",
+    "product_type",
+]
+
+# Explicit dtypes for the ticket frame. Low-cardinality strings are
+# categoricals and free text is Arrow-backed, instead of Python objects.
+COLUMN_DTYPES = {
+    **{column: "category" for column in CATEGORICAL_COLUMNS},
+    "ticket_subject": "string[pyarrow]",
+    "requested_date": "datetime64[ns]",
+    "ticket_updated_date": "datetime64[ns]",
+}
+
+# The derived calendar columns use the smallest integer types that hold them.
+# They are nullable because tickets without a requested date have none.
+DERIVED_DTYPES = {
+    "month_opened": "Int8",
+    "year_opened": "Int16",
+    "day_opened": "Int16",
+    "week_opened": "UInt8",
+}
+
+
+def preprocess_tickets(raw):
+    """Return the cleaned, feature-engineered ticket frame for ``raw``.
+
+    Pure function of its input: ``raw`` is not modified, so callers can cache
+    the result against the export's content hash. ``DROPPED_COLUMNS`` may
+    already be missing from ``raw`` (see ``coe_kpi.ingest``).
+    """
+    df = raw.drop(columns=DROPPED_COLUMNS, errors="ignore")
+    init_col_names = list(df.columns)
+    new_col_names = {
+        init_col_names[position]: name for position, name in COLUMN_POSITIONS.items()
+    }
+
+    df = df.rename(columns=new_col_names)[list(new_col_names.values())]
+
+    df = df.astype(COLUMN_DTYPES)
+
+    # Feature engineering
+
+    df["days_active"] = df.ticket_updated_date - df.requested_date
+    df["month_opened"] = df.requested_date.dt.month
+    df["year_opened"] = df.requested_date.dt.year
+
+    df["day_opened"] = df.requested_date.dt.day_of_year
+    df["week_opened"] = df.requested_date.dt.isocalendar().week
+
+    return df.astype(DERIVED_DTYPES)
+
+
+def collapse_categories(values, keep, other="Other"):
+    """Relabel ``values`` outside ``keep`` as ``other``.
+
+    The result is a categorical whose categories are ``keep`` in order, so
+    ``keep`` should already contain ``other``.
+    """
+    collapsed = values.astype(object).where(values.isin(keep), other)
+    return pd.Categorical(collapsed, categories=keep)
@@ -0,0 +1,117 @@
+"""Stage-level timing and memory instrumentation for the report pipeline.
+
+``Profiler.stage`` records wall time, CPU time of the calling thread and,
+when memory tracing is on, the peak traced Python heap size reached while the
+stage ran. A disabled profiler (``NO_PROFILER``) costs next to nothing, so pipeline
+functions can take one unconditionally.
+
+``tracemalloc`` is process-wide: peaks include allocations made by other
+sessions running at the same time, and tracing slows Python code down
+noticeably, so only enable it while diagnosing.
+"""
+import json
+import logging
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+
+logger = logging.getLogger(__name__)
+
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+
+
+@dataclass
+class StageTiming:
+    name: str
+    wall_seconds: float
+    cpu_seconds: float
+    peak_bytes: int = None
+
+
+class Profiler:
+    """Collects a ``StageTiming`` for every ``stage`` entered, in finish order."""
+
+    def __init__(self, enabled=True, trace_memory=False):
+        self.enabled = enabled
+        self.trace_memory = trace_memory and enabled
+        self.timings = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield
+            return
+
+        # Nested stages reset tracemalloc's peak, so each open stage keeps the
+        # highest peak seen by the stages nested inside it.
+        stack = self._stack()
+        if self.trace_memory and stack:
+            stack[-1] = max(stack[-1], tracemalloc.get_traced_memory()[1])
+        stack.append(0)
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.thread_time() - cpu_start
+            peak = stack.pop()
+            if self.trace_memory:
+                peak = max(peak, tracemalloc.get_traced_memory()[1])
+                if stack:
+                    stack[-1] = max(stack[-1], peak)
+            self.record(name, wall, cpu, peak if self.trace_memory else None)
+
+    def record(self, name, wall_seconds, cpu_seconds, peak_bytes=None):
+        """Add a timing measured elsewhere, e.g. in a worker process."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.timings.append(
+                StageTiming(name, wall_seconds, cpu_seconds, peak_bytes)
+            )
+
+    def __enter__(self):
+        global _tracing_users
+        if self.trace_memory:
+            with _tracing_lock:
+                if _tracing_users == 0 and not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                _tracing_users += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        global _tracing_users
+        if self.trace_memory:
+            with _tracing_lock:
+                _tracing_users -= 1
+                if _tracing_users == 0:
+                    tracemalloc.stop()
+
+    def as_records(self):
+        with self._lock:
+            return [asdict(timing) for timing in self.timings]
+
+    def to_json(self, **metadata):
+        return json.dumps({**metadata, "stages": self.as_records()}, indent=2)
+
+    def log(self, **metadata):
+        logger.info(
+            "report stages: %s", json.dumps({**metadata, "stages": self.as_records()})
+        )
+
+    def _stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+
+NO_PROFILER = Profiler(enabled=False)
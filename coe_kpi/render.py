@@ -0,0 +1,264 @@
+"""Render report figures to PNG, optionally across a pool of processes.
+
+The five charts are independent, so with more than one core they can be drawn
+at the same time. Work is described by zero-argument figure factories (usually
+``functools.partial`` over a ``coe_kpi.figures`` function and its aggregate
+frames), which pickle cheaply because the frames are already aggregated.
+"""
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from coe_kpi import aggregate, figures, sketch
+from coe_kpi.daterange import ReportRange, slice_months
+from coe_kpi.figure_cache import FigureCache, figure_png
+from coe_kpi.profiling import NO_PROFILER
+from coe_kpi.stats import CHART_VARIANTS
+
+FIGURE_NAMES = [
+    "tickets_per_month",
+    "average_days_to_close",
+    "count_product_tickets",
+    "count_client_tickets",
+    "average_days_by_product",
+]
+
+# The aggregate each close-time quantile chart reads; one per close-time chart
+# holds every quantile (see ``coe_kpi.stats``).
+QUANTILE_AGGREGATES = {
+    "average_days_to_close": "close_time_quantiles",
+    "average_days_by_product": "product_close_time_quantiles",
+}
+
+
+def make_render_pool(max_workers=None):
+    """Return a process pool for ``render_pngs``, or None on a single core.
+
+    Workers are spawned rather than forked: forking a multi-threaded server
+    process (such as Streamlit's) can deadlock.
+    """
+    cpus = os.cpu_count() or 1
+    if cpus < 2:
+        return None
+    return ProcessPoolExecutor(
+        max_workers=max_workers or min(cpus, 5),
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+
+def render_png(make_figure, dpi=200):
+    return figure_png(make_figure(), dpi=dpi)
+
+
+def _timed_render_png(make_figure, dpi):
+    # Runs in a pool worker: time plotting and encoding there and send the
+    # (wall, cpu) pairs back with the PNG.
+    wall, cpu = time.perf_counter(), time.thread_time()
+    fig = make_figure()
+    plot = (time.perf_counter() - wall, time.thread_time() - cpu)
+    wall, cpu = time.perf_counter(), time.thread_time()
+    png = figure_png(fig, dpi=dpi)
+    savefig = (time.perf_counter() - wall, time.thread_time() - cpu)
+    return png, {"plot": plot, "savefig": savefig}
+
+
+def render_pngs(makers, dpi=200, pool=None, profiler=NO_PROFILER):
+    """Render ``{name: make_figure}`` to ``{name: png_bytes}``.
+
+    Figures are drawn in ``pool`` when one is given and there is more than one
+    to draw, otherwise serially in this process. Plotting and PNG encoding are
+    recorded as ``plot.<name>`` and ``savefig.<name>`` stages of ``profiler``.
+    """
+    if pool is None or len(makers) < 2:
+        pngs = {}
+        for name, make in makers.items():
+            with profiler.stage(f"plot.{name}"):
+                fig = make()
+            with profiler.stage(f"savefig.{name}"):
+                pngs[name] = figure_png(fig, dpi=dpi)
+        return pngs
+
+    submit = _timed_render_png if profiler.enabled else render_png
+    futures = {name: pool.submit(submit, make, dpi) for name, make in makers.items()}
+    pngs = {name: future.result() for name, future in futures.items()}
+    if profiler.enabled:
+        for name, (png, timings) in pngs.items():
+            for stage, (wall, cpu) in timings.items():
+                profiler.record(f"{stage}.{name}", wall, cpu)
+            pngs[name] = png
+    return pngs
+
+
+def render_cached(makers, cache, dpi=200, pool=None, profiler=NO_PROFILER, **params):
+    """Like ``render_pngs``, but serve hits from and store misses in ``cache``.
+
+    ``params`` (the export fingerprint and render options) go into each
+    figure's ``FigureCache`` key alongside its name and ``dpi``. A figure that
+    another thread is already rendering is waited for, not drawn again.
+    """
+    keys = {name: FigureCache.key(name, dpi=dpi, **params) for name in makers}
+    with profiler.stage("render.cache_lookup"):
+        pngs = {name: cache.get(key) for name, key in keys.items()}
+
+    owned, waiting = {}, {}
+    for name in [name for name, png in pngs.items() if png is None]:
+        future, owner = cache.flight.claim(keys[name])
+        if not owner:
+            waiting[name] = future
+            continue
+        # It may have been stored between the lookup and the claim.
+        pngs[name] = cache.get(keys[name])
+        if pngs[name] is None:
+            owned[name] = makers[name]
+        else:
+            cache.flight.resolve(keys[name], pngs[name])
+
+    try:
+        rendered = render_pngs(owned, dpi=dpi, pool=pool, profiler=profiler)
+    except BaseException as err:
+        for name in owned:
+            cache.flight.fail(keys[name], err)
+        raise
+    for name, png in rendered.items():
+        cache.put(keys[name], png)
+        cache.flight.resolve(keys[name], png)
+        pngs[name] = png
+
+    if waiting:
+        with profiler.stage("render.wait"):
+            for name, future in waiting.items():
+                pngs[name] = future.result()
+    return pngs
+
+
+def aggregate_name(name):
+    """The aggregate chart ``name`` is drawn from."""
+    chart, statistic = CHART_VARIANTS.get(name, (name, "mean"))
+    return name if statistic == "mean" else QUANTILE_AGGREGATES[chart]
+
+
+def report_aggregates(
+    cube, primary_year, products, clients, names=FIGURE_NAMES, close_time_sketch=None
+):
+    """The aggregate frames with the given names (see ``aggregate_name``).
+
+    Quantile aggregates come from ``close_time_sketch`` (see ``coe_kpi.sketch``),
+    everything else from ``cube``.
+    """
+    builders = {
+        "tickets_per_month": lambda: aggregate.monthly_counts(cube),
+        "average_days_to_close": lambda: aggregate.monthly_close_times(
+            cube, start_year=primary_year
+        ),
+        "count_product_tickets": lambda: aggregate.product_counts(cube, products),
+        "count_client_tickets": lambda: aggregate.client_counts(cube, clients),
+        "average_days_by_product": lambda: aggregate.product_close_times(
+            cube, products
+        ),
+        "close_time_quantiles": lambda: sketch.monthly_close_time_quantiles(
+            close_time_sketch, start_year=primary_year
+        ),
+        "product_close_time_quantiles": lambda: sketch.product_close_time_quantiles(
+            close_time_sketch, products
+        ),
+    }
+    return {name: builders[name]() for name in names}
+
+
+def figure_maker(
+    name,
+    frame,
+    products,
+    clients,
+    primary_year,
+    current_year,
+    current_month,
+    start_key=None,
+):
+    """A figure factory for chart ``name`` drawn from its aggregate ``frame``.
+
+    ``start_key`` starts the chart at that month (see ``coe_kpi.figures``).
+    ``name`` may be a close-time chart variant (see ``coe_kpi.stats``).
+    """
+    name, statistic = CHART_VARIANTS.get(name, (name, None))
+    if name == "tickets_per_month":
+        return partial(
+            figures.tickets_per_month_figure,
+            frame,
+            primary_year,
+            current_year,
+            current_month,
+            start_key=start_key,
+        )
+    if name == "average_days_to_close":
+        return partial(
+            figures.close_times_figure,
+            frame,
+            current_year,
+            current_month,
+            start_key=start_key,
+            statistic=statistic,
+        )
+    if name == "average_days_by_product":
+        return partial(
+            figures.product_close_times_figure,
+            frame,
+            products,
+            current_year,
+            current_month,
+            start_key=start_key,
+            statistic=statistic,
+        )
+    draw, members = {
+        "count_product_tickets": (figures.product_counts_figure, products),
+        "count_client_tickets": (figures.client_counts_figure, clients),
+    }[name]
+    return partial(
+        draw, frame, members, current_year, current_month, start_key=start_key
+    )
+
+
+def report_figure_makers(
+    cube,
+    primary_year,
+    current_year,
+    current_month,
+    names=FIGURE_NAMES,
+    date_range=None,
+):
+    """Figure factories for the named report charts, aggregated from ``cube``.
+
+    Only the aggregates the requested charts need are computed. With a
+    ``date_range`` (inclusive month keys) top products and clients are ranked
+    within it and the charts only cover it.
+    """
+    if date_range is None:
+        products = aggregate.top_products(cube)
+        clients = aggregate.top_clients(cube)
+    else:
+        report_range = ReportRange(cube)
+        products = report_range.top_products(*date_range)
+        clients = report_range.top_clients(*date_range)
+
+    frames = report_aggregates(cube, primary_year, products, clients, names)
+    start_key = None
+    if date_range is not None:
+        frames = {
+            name: slice_months(frame, *date_range) for name, frame in frames.items()
+        }
+        start_key = date_range[0]
+    return {
+        name: figure_maker(
+            name,
+            frame,
+            products,
+            clients,
+            primary_year,
+            current_year,
+            current_month,
+            start_key=start_key,
+        )
+        for name, frame in frames.items()
+    }
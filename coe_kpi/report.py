@@ -0,0 +1,363 @@
+"""The report as data, independent of Streamlit.
+
+``ReportEngine`` turns a cube and a ``ReportPeriod`` into one ``TabResult`` per
+report tab: the chart's aggregate frame, a ``FigureSpec`` to draw it and the
+KPI ``Metric``s shown beside it; ``chart`` gives a tab's interactive version.
+Top products and clients and the aggregates are computed on first use and
+kept, so a view that shows a single tab only pays for that tab. The close-time
+tabs have a variant per statistic (``TAB_VARIANTS``, see ``coe_kpi.stats``).
+``streamlit_app.py`` is a thin view over the engine, and ``coe_kpi.batch``
+draws the same figure specs headless.
+"""
+from dataclasses import dataclass, field, replace
+from datetime import date
+from functools import cached_property
+
+import pandas as pd
+
+from coe_kpi.aggregate import top_clients, top_products
+from coe_kpi.charts import report_chart
+from coe_kpi.daterange import ReportRange, slice_months
+from coe_kpi.figures import PALETTE
+from coe_kpi.kpi import KpiLookup, metric_value
+from coe_kpi.months import key_month, key_year, month_key
+from coe_kpi.profiling import NO_PROFILER
+from coe_kpi.render import (
+    FIGURE_NAMES,
+    QUANTILE_AGGREGATES,
+    aggregate_name,
+    figure_maker,
+    report_aggregates,
+)
+from coe_kpi.result_cache import NO_CACHE
+from coe_kpi.stats import CLOSE_TIME_CHARTS, STATISTICS, chart_variant
+
+
+@dataclass(frozen=True)
+class TabDefinition:
+    """A report tab: its chart and the aggregate column its KPIs read."""
+
+    name: str
+    title: str
+    value: str
+    dimension: str = None
+    metric_label: str = None
+
+
+# In display order.
+TABS = [
+    TabDefinition(
+        "tickets_per_month", "Tickets per Month", "ticket_count", None, "No. Tickets"
+    ),
+    TabDefinition(
+        "count_product_tickets", "Ticket Count by Product", "count", "product_type"
+    ),
+    TabDefinition(
+        "count_client_tickets", "Ticket Count by Client", "count", "client_name"
+    ),
+    TabDefinition(
+        "average_days_to_close",
+        "Average Days to Close Tickets",
+        "rounded_days_active",
+        None,
+        "Avg. Days to Close",
+    ),
+    TabDefinition(
+        "average_days_by_product",
+        "Average Days to Close Tickets by Product",
+        "rounded_days_active",
+        "product_type",
+    ),
+]
+
+
+def _close_time_variant(tab, statistic):
+    statistic = STATISTICS[statistic]
+    return replace(
+        tab,
+        name=chart_variant(tab.name, statistic.name),
+        title=tab.title.replace("Average", statistic.title, 1),
+        value=statistic.column,
+        metric_label=tab.metric_label
+        and tab.metric_label.replace("Avg.", statistic.short, 1),
+    )
+
+
+# The tabs in display order for each close-time statistic.
+TAB_VARIANTS = {
+    statistic: [
+        _close_time_variant(tab, statistic) if tab.name in CLOSE_TIME_CHARTS else tab
+        for tab in TABS
+    ]
+    for statistic in STATISTICS
+}
+TABS_BY_NAME = {tab.name: tab for tabs in TAB_VARIANTS.values() for tab in tabs}
+
+
+@dataclass(frozen=True)
+class ReportPeriod:
+    """When the report is run, and optionally the months its charts cover.
+
+    Without a ``date_range`` the charts cover the usual window ending in the
+    month before ``current_month``. KPIs always compare that month with the
+    month and year before.
+    """
+
+    current_year: int
+    current_month: int
+    date_range: tuple = None
+
+    @classmethod
+    def latest(cls, cube):
+        """The report run in the month of ``cube``'s latest ticket.
+
+        That month is still in progress, so the KPIs cover the month before
+        it. This is how the archived reports are dated.
+        """
+        if not len(cube):
+            today = date.today()
+            return cls(today.year, today.month)
+        key = int(month_key(cube.year_opened, cube.month_opened).max())
+        return cls(int(key_year(key)), int(key_month(key)))
+
+    @classmethod
+    def for_range(cls, date_range):
+        """A custom range (inclusive month keys), reported as if run the month after."""
+        after = date_range[1] + 1
+        return cls(int(key_year(after)), int(key_month(after)), tuple(date_range))
+
+    @property
+    def primary_year(self):
+        if self.date_range is not None:
+            return int(key_year(self.date_range[0]))
+        return self.current_year - 4
+
+    @property
+    def aggregate_year(self):
+        """The first year the aggregates cover: the charts' and the KPIs'."""
+        # The KPI month is the one before current_month, compared with a year before.
+        kpi_key = int(month_key(self.current_year, self.current_month)) - 13
+        return min(self.primary_year, int(key_year(kpi_key)))
+
+    @property
+    def start_key(self):
+        return None if self.date_range is None else self.date_range[0]
+
+
+@dataclass
+class Metric:
+    label: str
+    value: int
+    month_delta: float
+    year_delta: float
+
+
+@dataclass
+class FigureSpec:
+    """A chart to draw: a zero-argument figure factory and its cache params."""
+
+    name: str
+    make: object
+    params: dict = field(default_factory=dict)
+
+
+@dataclass
+class TabResult:
+    tab: TabDefinition
+    frame: pd.DataFrame
+    figure: FigureSpec
+    metrics: list
+
+
+class ReportEngine:
+    """Lazily computed results for one report on ``cube``.
+
+    ``digest`` fingerprints the cube's data for figure caches. An archived
+    report passes its stored ``products``, ``clients`` and ``aggregates``; a
+    ``report_range`` can be shared between reports on the same cube. Given a
+    ``ResultCache``, top members, aggregates and tab results are shared with
+    every other engine on the same digest (see ``coe_kpi.result_cache``).
+    Close-time quantile tabs need the export's ``close_time_sketch``
+    (see ``coe_kpi.sketch``).
+    """
+
+    def __init__(
+        self,
+        cube,
+        period,
+        digest,
+        products=None,
+        clients=None,
+        aggregates=None,
+        report_range=None,
+        profiler=NO_PROFILER,
+        cache=NO_CACHE,
+        close_time_sketch=None,
+    ):
+        self.cube = cube
+        self.close_time_sketch = close_time_sketch
+        self.period = period
+        self.digest = digest
+        self.profiler = profiler
+        self.cache = cache
+        self._members = None if products is None else (products, clients)
+        self._aggregates = dict(aggregates or {})
+        self._report_range = report_range
+
+    @property
+    def products(self):
+        return self._top_members[0]
+
+    @property
+    def clients(self):
+        return self._top_members[1]
+
+    @cached_property
+    def _top_members(self):
+        if self._members is not None:
+            return self._members
+        return self.cache.get_or_compute(
+            ("top_members", self.digest, self.period.date_range),
+            self._compute_top_members,
+        )
+
+    def _compute_top_members(self):
+        with self.profiler.stage("aggregate.top_members"):
+            if self.period.date_range is None:
+                return top_products(self.cube), top_clients(self.cube)
+            return (
+                self.report_range.top_products(*self.period.date_range),
+                self.report_range.top_clients(*self.period.date_range),
+            )
+
+    @property
+    def report_range(self):
+        """A ``ReportRange`` over the cube, built on first use."""
+        if self._report_range is None:
+            self._report_range = ReportRange(self.cube)
+        return self._report_range
+
+    def ticket_count(self):
+        """Tickets opened in the period's date range, or None without one."""
+        if self.period.date_range is None:
+            return None
+        return self.report_range.ticket_count(*self.period.date_range)
+
+    @property
+    def render_params(self):
+        """Everything besides the aggregates that changes a chart's pixels."""
+        return {
+            "digest": self.digest,
+            "primary_year": self.period.primary_year,
+            "current_year": self.period.current_year,
+            "current_month": self.period.current_month,
+            "palette": PALETTE,
+            "date_range": self.period.date_range,
+        }
+
+    def aggregate(self, name):
+        """Chart ``name``'s aggregate over the cube's whole history."""
+        name = aggregate_name(name)
+        if name not in self._aggregates:
+            self._aggregates[name] = self.cache.get_or_compute(
+                ("aggregate", name, self.period.aggregate_year) + self._members_key,
+                lambda: self._compute_aggregate(name),
+            )
+        return self._aggregates[name]
+
+    def _compute_aggregate(self, name):
+        if name in QUANTILE_AGGREGATES.values() and self.close_time_sketch is None:
+            raise ValueError(f"{name} needs the report's close-time sketch")
+        products, clients = self._top_members
+        with self.profiler.stage(f"aggregate.{name}"):
+            return report_aggregates(
+                self.cube,
+                self.period.aggregate_year,
+                products,
+                clients,
+                names=[name],
+                close_time_sketch=self.close_time_sketch,
+            )[name]
+
+    @property
+    def _members_key(self):
+        # Everything an aggregate depends on besides the chart and its window.
+        return (self.digest, tuple(self.products), tuple(self.clients))
+
+    def chart_frame(self, name):
+        """Chart ``name``'s aggregate, cut to the period's date range if any."""
+        frame = self.aggregate(name)
+        if self.period.date_range is not None:
+            frame = slice_months(frame, *self.period.date_range)
+        return frame
+
+    def figure(self, name):
+        period = self.period
+        return FigureSpec(
+            name,
+            figure_maker(
+                name,
+                self.chart_frame(name),
+                self.products,
+                self.clients,
+                period.primary_year,
+                period.current_year,
+                period.current_month,
+                start_key=period.start_key,
+            ),
+            self.render_params,
+        )
+
+    def chart(self, name):
+        """The interactive (Vega-Lite) version of chart ``name``."""
+        period = self.period
+        return report_chart(
+            name,
+            self.chart_frame(name),
+            self.products,
+            self.clients,
+            period.primary_year,
+            period.current_year,
+            period.current_month,
+            start_key=period.start_key,
+        )
+
+    def figure_makers(self, names=FIGURE_NAMES):
+        return {name: self.figure(name).make for name in names}
+
+    def metrics(self, name):
+        """KPIs for the month before ``current_month``, one per tab member.
+
+        They read the unsliced aggregate, so the month and year before a
+        custom range's last month can still be compared.
+        """
+        tab = TABS_BY_NAME[name]
+        members = None
+        if tab.dimension == "product_type":
+            members = self.products
+        elif tab.dimension == "client_name":
+            members = self.clients
+        kpis = KpiLookup(
+            self.aggregate(name), tab.value, tab.dimension, members
+        ).compare(self.period.current_year, self.period.current_month - 1)
+        labels = members if tab.dimension else [tab.metric_label]
+        return [
+            Metric(label, metric_value(value), month_delta, year_delta)
+            for label, value, month_delta, year_delta in zip(
+                labels, kpis.current, kpis.month_delta, kpis.year_delta
+            )
+        ]
+
+    def tab(self, name):
+        return self.cache.get_or_compute(
+            ("tab", name, self.period) + self._members_key,
+            lambda: self._compute_tab(name),
+        )
+
+    def _compute_tab(self, name):
+        return TabResult(
+            TABS_BY_NAME[name],
+            self.chart_frame(name),
+            self.figure(name),
+            self.metrics(name),
+        )
@@ -0,0 +1,111 @@
+"""A process-wide cache of derived report results, shared by every session.
+
+Several people tend to open the same report right after an export lands. Each
+Streamlit session runs the script on its own thread, so without coordination
+each of them would aggregate and draw the same report. ``ResultCache`` keeps
+recent results in a thread-safe LRU. ``SingleFlight`` makes concurrent misses
+on one key wait for a single computation instead of repeating it. The first
+caller computes; the rest block until it finishes and get its result, or its
+exception. Failures are not cached.
+"""
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+DEFAULT_MAX_ENTRIES = 512
+
+
+class SingleFlight:
+    """Deduplicate concurrent computations of the same key."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def claim(self, key):
+        """Return ``(future, owner)``; only the owner computes ``key``.
+
+        The owner must finish the call with ``resolve`` or ``fail``; everyone
+        else waits on ``future.result()``.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                return future, False
+            future = self._calls[key] = Future()
+            return future, True
+
+    def resolve(self, key, value):
+        with self._lock:
+            future = self._calls.pop(key)
+        future.set_result(value)
+
+    def fail(self, key, error):
+        with self._lock:
+            future = self._calls.pop(key)
+        future.set_exception(error)
+
+    def do(self, key, compute):
+        """Return ``compute()``, sharing one call among concurrent callers."""
+        future, owner = self.claim(key)
+        if not owner:
+            return future.result()
+        try:
+            value = compute()
+        except BaseException as err:
+            self.fail(key, err)
+            raise
+        self.resolve(key, value)
+        return value
+
+
+class ResultCache:
+    """Thread-safe LRU of computed results with single-flight misses.
+
+    Keys must be hashable and identify everything the result depends on.
+    Cached values are shared between sessions and must not be mutated.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+        return self._flight.do(key, lambda: self._compute(key, compute))
+
+    def _compute(self, key, compute):
+        with self._lock:
+            # Stored by a call that finished after our lookup above.
+            if key in self._entries:
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+        value = compute()
+        with self._lock:
+            self._entries[key] = value
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class NoCache:
+    """Stands in for a ``ResultCache`` when results shouldn't be shared."""
+
+    def get_or_compute(self, key, compute):
+        return compute()
+
+
+NO_CACHE = NoCache()
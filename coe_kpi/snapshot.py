@@ -0,0 +1,114 @@
+"""Persistent columnar snapshots of Zendesk exports.
+
+Parsing an ``.xlsx`` export with openpyxl takes seconds, so the first load of an
+export is written to a Parquet file named after the SHA-256 of its bytes.
+Later loads of the same content (uploads or the archived ``coe_kpi_*.xlsx``
+reports) memory-map that file instead of reparsing the workbook.
+"""
+import hashlib
+import logging
+import os
+import threading
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from coe_kpi.ingest import read_export
+
+logger = logging.getLogger(__name__)
+
+CACHE_ROOT = Path(os.environ.get("COE_KPI_CACHE_DIR", ".cache"))
+DEFAULT_CACHE_DIR = CACHE_ROOT / "snapshots"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def file_digest(file, chunk_size=1024 * 1024):
+    """Return the SHA-256 hex digest of a path or a seekable file-like object."""
+    digest = hashlib.sha256()
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, "rb") as handle:
+            for chunk in iter(lambda: handle.read(chunk_size), b""):
+                digest.update(chunk)
+    else:
+        file.seek(0)
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+        file.seek(0)
+    return digest.hexdigest()
+
+
+class SnapshotCache:
+    """Content-addressed Parquet cache with least-recently-used eviction.
+
+    The total size of the cache directory is kept under ``max_bytes``; reads
+    refresh a snapshot's mtime so the oldest untouched snapshots go first.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+
+    def path_for(self, digest):
+        return self.directory / f"{digest}.parquet"
+
+    def load(self, file, digest=None):
+        """Return the export as a DataFrame, parsing it only on a cache miss."""
+        if digest is None:
+            digest = file_digest(file)
+
+        cached = self.read(digest)
+        if cached is not None:
+            return cached
+
+        df = read_export(file)
+        self.write(digest, df)
+        return df
+
+    def read(self, digest):
+        path = self.path_for(digest)
+        if not path.exists():
+            return None
+        try:
+            table = pq.read_table(path, memory_map=True)
+        except (OSError, pa.ArrowException):
+            logger.warning("Discarding unreadable snapshot %s", path)
+            path.unlink(missing_ok=True)
+            return None
+        os.utime(path)
+        return table.to_pandas()
+
+    def write(self, digest, df):
+        path = self.path_for(digest)
+        # Sessions share the process, so two threads may write one digest.
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            pq.write_table(table, tmp_path)
+            os.replace(tmp_path, path)
+        except (OSError, pa.ArrowException) as err:
+            # Mixed-type cells can't always be expressed in Arrow; the export
+            # still loads, it just isn't cached.
+            logger.warning("Could not snapshot export %s: %s", digest, err)
+            tmp_path.unlink(missing_ok=True)
+            return
+        self.evict()
+
+    def evict(self):
+        evict_least_recently_used(self.directory, "*.parquet", self.max_bytes)
+
+
+def evict_least_recently_used(directory, pattern, max_bytes, keep=()):
+    """Delete the oldest files matching ``pattern`` until the rest fit ``max_bytes``.
+
+    "Oldest" is by mtime, so readers refresh an entry with ``os.utime``. Paths
+    in ``keep`` count towards the total but are never deleted.
+    """
+    entries = sorted(Path(directory).glob(pattern), key=lambda p: p.stat().st_mtime)
+    total = sum(p.stat().st_size for p in entries)
+    entries = [path for path in entries if path not in keep]
+    while entries and total > max_bytes:
+        oldest = entries.pop(0)
+        total -= oldest.stat().st_size
+        oldest.unlink(missing_ok=True)
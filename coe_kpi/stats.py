@@ -0,0 +1,53 @@
+"""Resolution-time statistics beyond the mean.
+
+A mean can be summed cell by cell in the cube, but a few tickets left open for
+years skew it. Medians and upper percentiles can't be summed; they come from
+mergeable per-cell sketches instead (see ``coe_kpi.sketch``).
+
+``STATISTICS`` lists the ways the close-time tabs can summarize a month. The
+mean still comes from the cube (see ``coe_kpi.aggregate``). Each of the two
+close-time charts has a variant per statistic, named like
+``median_days_to_close`` (see ``chart_variant``).
+"""
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class Statistic:
+    """A close-time summary: its aggregate column and how charts name it."""
+
+    name: str
+    column: str
+    title: str
+    axis: str
+    short: str
+    quantile: float = None
+
+
+STATISTICS = {
+    statistic.name: statistic
+    for statistic in [
+        Statistic("mean", "rounded_days_active", "Average", "Mean", "Avg."),
+        Statistic("median", "median_days", "Median", "Median", "Median", 0.5),
+        Statistic("p90", "p90_days", "90th Percentile", "90th Percentile", "P90", 0.9),
+        Statistic("p95", "p95_days", "95th Percentile", "95th Percentile", "P95", 0.95),
+    ]
+}
+QUANTILES = [statistic for statistic in STATISTICS.values() if statistic.quantile]
+
+CLOSE_TIME_CHARTS = ["average_days_to_close", "average_days_by_product"]
+
+
+def chart_variant(name, statistic):
+    """The name of chart ``name`` drawn with close-time ``statistic``."""
+    if name not in CLOSE_TIME_CHARTS or statistic == "mean":
+        return name
+    return name.replace("average", statistic, 1)
+
+
+# Chart variant name -> (close-time chart, statistic).
+CHART_VARIANTS = {
+    chart_variant(name, statistic): (name, statistic)
+    for name in CLOSE_TIME_CHARTS
+    for statistic in STATISTICS
+}
@@ -1,15 +1,30 @@
 import time
 import calendar
+import math
 from datetime import datetime
-import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+from functools import partial
+from operator import itemgetter
 import streamlit as st
-import altair as alt
-import zipfile
-import base64
 
+from coe_kpi.archive import ArchiveStore
+from coe_kpi.blobs import BlobStore
+from coe_kpi.daterange import ReportRange
+from coe_kpi.export import EXPORT_DPI, zip_pngs
+from coe_kpi.figure_cache import DEFAULT_DISK_DIR, FigureCache
+from coe_kpi.history import FULL_SCAN_EVERY, TicketHistory
+from coe_kpi.jobs import JobRunner, load_export, precompute_report
+from coe_kpi.months import month_key
+from coe_kpi.preprocess import preprocess_tickets
+from coe_kpi.profiling import NO_PROFILER, Profiler
+from coe_kpi.render import make_render_pool, render_cached
+from coe_kpi.report import TAB_VARIANTS, TABS_BY_NAME, ReportEngine, ReportPeriod
+from coe_kpi.result_cache import ResultCache
+from coe_kpi.snapshot import SnapshotCache
+from coe_kpi.stats import STATISTICS
+
+
+# How often a tab still being prepared in the background checks on its job.
+JOB_POLL_SECONDS = 0.5
 
 # st.set_page_config(layout="wide")
 st.set_page_config(
@@ -29,1077 +44,571 @@ Questions / comments / concerns / requests: [fislam@enstoa.com](mailto:fislam@en
 """
 
 
-def get_base64_encoded_file(file_path):
-    with open(file_path, "rb") as file:
-        encoded_file = base64.b64encode(file.read()).decode()
-    return encoded_file
+def figure_download_button(export, name, key):
+    if export is None:
+        st.button("Download This Figure", disabled=True, key=key)
+    else:
+        st.download_button(
+            "Download This Figure",
+            data=export,
+            file_name=f"{name}.png",
+            mime="image/png",
+            key=key,
+        )
 
 
-@st.cache_data()
-def load_data(file):
-    return pd.read_excel(file)
+@st.cache_resource
+def get_snapshot_cache():
+    return SnapshotCache()
 
 
-def create_figures(
-    data,
-    current_month=None,
-    download_figs=False,
-    interactive_charts=False
-    # start_month=None,
-    # start_year=None,
-    # end_month=None,
-    # end_year=None,
-):
-    if not current_month:
-        current_month = datetime.now().month
-
-    interactive_charts = False
-
-    custom_date = False
-
-    # if (
-    #     start_month != "January"
-    #     or start_year != 2022
-    #     or end_month != "June"
-    #     or end_year != 2023
-    # ):
-    #     custom_date = True
-    #     primary_year = start_year
-    #     primary_month = start_month
-    #     current_year = end_year
-    #     current_month = datetime.strptime(end_month, "%B").month
-    #     # current_month = end_month
-    #     secondary_year_month = f"{current_year}-{current_month}"
-
-    if not custom_date:
-        current_year = 2023
-        primary_year = current_year - 4
-        primary_month = 1
-        secondary_year_month = "2022-1"
-
-    progress_text = "Loading..."
-    progress_bar = st.progress(0, progress_text)
-
-    # TODO: A LOT
-    # TODO: move and rename tabs instead of messing around like below
-    # TODO: @s don't work well in df.query()s for some reason, replace w f-strings if necessary (mem issue?)
-    # TODO: make literally everything MD lol so that it doesn't reset stuff
-    # TODO: make a 'reset_date' button so that date can be restored to normal if messed around with a bit too much
-    # have to consider that charts are different dates, so actually 'reset' would just make the appearance
-    # the same as the start, but the charts would also be the same as the start, ie. not following the appearnce
-    # note: primary = tab1 and tab 2
-    #   secondary = tab3, tab4, and tab5
-    tab1, tab3, tab4, tab2, tab5 = st.tabs(
-        [
-            "Tickets per Month",
-            "Ticket Count by Product",
-            "Ticket Count by Client",
-            "Average Days to Close Tickets",
-            "Average Days to Close Tickets by Product",
-        ]
-    )
-    if download_figs:
-        temp_download_all_button = download_section.markdown(
-            f"""
-        <style>
-        .temp-download-all-button {{
-            text-decoration: none !important;
-            padding: 6px 12px;
-            background-color: transparent;
-            color: white !important;
-            border-radius: 4px;
-            border: 2px solid #D3D3D3;
-            cursor: not-allowed;
-            display: inline-block;
-            transition: background-color 0s, border-color 0s, color 0s;
-            width: 100%;
-            box-sizing: border-box;
-            text-align: center;
-        }}
-        .temp-download-all-button:hover {{
-            text-decoration: none !important;
-            border-color: red;
-            color: red !important;
-        }}
-        </style>
-        <div class="temp-download-all-button">Please wait...</div>
-        """,
-            unsafe_allow_html=True,
-        )
+@st.cache_resource
+def get_blob_store():
+    return BlobStore()
 
-    df = load_data(data)
 
-    # Pre-processing
+def stored_upload(uploaded_file):
+    # Hashed and stored once per upload; the session's handle keeps the blob
+    # pinned until the upload is replaced or removed.
+    stored = st.session_state.get("stored_upload")
+    if stored is None or stored[0] != uploaded_file.file_id:
+        stored = (uploaded_file.file_id, get_blob_store().put(uploaded_file))
+        st.session_state.stored_upload = stored
+    return stored[1]
 
-    df = df.drop(
-        columns=["Latest Update", "Tickets", "Assignee name", "Requester name"]
-    )
-    init_col_names = list(df.dtypes.reset_index()["index"])
-
-    new_col_names = {
-        init_col_names[0]: "ticket_id",
-        init_col_names[1]: "client_name",
-        init_col_names[2]: "ticket_status",
-        init_col_names[3]: "ticket_type",
-        init_col_names[4]: "ticket_subject",
-        init_col_names[5]: "ticket_priority",
-        init_col_names[7]: "environment",
-        init_col_names[8]: "product_type",
-        init_col_names[6]: "requested_date",
-        init_col_names[9]: "ticket_updated_date",
-    }
 
-    df = df.rename(columns=new_col_names)[new_col_names.values()]
-
-    df = df.astype(
-        {
-            # df.columns[0]: 'object',
-            # df.columns[1]: 'object',
-            # df.columns[2]: '',
-            # df.columns[3]: '',
-            # df.columns[4]: '',
-            # df.columns[5]: '',
-            # df.columns[6]: '',
-            # df.columns[7]: '',
-            df.columns[8]: "datetime64[ns]",
-            df.columns[9]: "datetime64[ns]",
-        }
-    )
+def load_data(file, digest=None):
+    return get_snapshot_cache().load(file, digest=digest)
 
-    # Feature engineering
 
-    df["days_active"] = df.ticket_updated_date - df.requested_date
-    df["month_opened"] = df.requested_date.dt.month
-    df["year_opened"] = df.requested_date.dt.year
+@st.cache_data()
+def load_tickets(digest, _file, _profiler=NO_PROFILER):
+    # Keyed on the content hash only; the file object itself is not hashed.
+    with _profiler.stage("load.snapshot"):
+        raw = load_data(_file, digest=digest)
+    with _profiler.stage("load.preprocess"):
+        return preprocess_tickets(raw)
 
-    df["day_opened"] = df.requested_date.dt.day_of_year
-    df["week_opened"] = df.requested_date.dt.isocalendar().week
 
-    df_monthly_grouped = (
-        df.groupby(by=["year_opened", "month_opened"])
-        .month_opened.count()
-        .reset_index(name="ticket_count")
-        .astype({"month_opened": "int32"})
-    )
+@st.cache_resource
+def get_report_range(digest, _cube):
+    return ReportRange(_cube)
+
+
+@st.cache_resource
+def get_archive_store():
+    return ArchiveStore()
+
 
-    custom_palette = sns.color_palette(
-        ["#264653", "#2A9D8F", "#E9C46A", "#F4A261", "#E76F51", "#E97C61"]
+@st.cache_resource
+def get_result_cache():
+    # Shared by every session, so concurrent viewers of one report aggregate
+    # and draw it once.
+    return ResultCache()
+
+
+def open_archived_report(entry):
+    source = entry.source.stat()
+    return get_result_cache().get_or_compute(
+        ("archive", entry.id, source.st_mtime_ns, source.st_size),
+        lambda: get_archive_store().open(entry),
     )
 
-    # with st.expander("Tickets Per Month"):
-    with tab1:
-        col1, col2 = st.columns([0.8, 0.2], gap="small")
-
-        with col1:
-            # st.write(f"end_month: {end_month}")
-            # st.write(start_month, start_year, end_month, end_year)
-            # st.write(primary_month, primary_year)
-            # st.write(f"curr_month:{current_month} ")
-            # st.write(f"curr_year: {current_year}")
-            # Fig 1: Tickets per month
-            if interactive_charts:
-                custom_palette2 = [
-                    "#264653",
-                    "#2A9D8F",
-                    "#E9C46A",
-                    "#F4A261",
-                    "#E76F51",
-                ]
-
-                source = df_monthly_grouped.query(
-                    f"(year_opened >= ({primary_year}) & year_opened < {current_year}) | (year_opened == {current_year} & month_opened < {current_month})"
-                )
-
-                base = alt.Chart(source).properties(height=600)
-
-                highlight = alt.selection(
-                    type="single",
-                    on="mouseover",
-                    fields=["month_opened"],
-                    nearest=True,
-                )
-
-                tooltip = [
-                    alt.Tooltip("month_opened:O", title="Month of Year"),
-                    alt.Tooltip("ticket_count:Q", title="Tickets Opened"),
-                    alt.Tooltip("year_opened:N", title="Year"),
-                ]
-
-                color = alt.Color(
-                    "year_opened:N",
-                    legend=alt.Legend(title="Year", titleFontSize=20, labelFontSize=16),
-                    scale=alt.Scale(range=custom_palette2),
-                )
-
-                points = (
-                    base.mark_circle()
-                    .encode(opacity=alt.value(0))
-                    .add_selection(highlight)
-                )
-
-                line = base.mark_line(strokeWidth=4).encode(
-                    x=alt.X(
-                        "month_opened:O",
-                        title="Month of Year",
-                        axis=alt.Axis(
-                            values=list(range(1, 13)),
-                            tickCount=12,
-                            labelExpr="datum.value === 1 ? 'January' : datum.value === 2 ? 'February' : datum.value === 3 ? 'March' : datum.value === 4 ? 'April' : datum.value === 5 ? 'May' : datum.value === 6 ? 'June' : datum.value === 7 ? 'July' : datum.value === 8 ? 'August' : datum.value === 9 ? 'September' : datum.value === 10 ? 'October' : datum.value === 11 ? 'November' : 'December'",
-                            labelAngle=315,
-                            titlePadding=20,
-                        ),
-                    ),
-                    y=alt.Y("ticket_count", title="Tickets Opened"),
-                    color=color,
-                    opacity=alt.condition(highlight, alt.value(1), alt.value(0.2)),
-                    tooltip=tooltip,
-                )
-
-                chart = (
-                    (points + line)
-                    .configure_axis(
-                        titleFontSize=20,
-                        labelFontSize=16,
-                    )
-                    .interactive()
-                )
-
-                st.altair_chart(chart, use_container_width=True)
-
-            # if not interactive_charts:
-            fig, ax = plt.subplots(figsize=(13.6, 7))
-
-            bplot = sns.barplot(
-                data=df_monthly_grouped.query(f"year_opened >= {primary_year}"),
-                x="month_opened",
-                y="ticket_count",
-                hue="year_opened",
-                palette=custom_palette,
-                ax=ax,
-                errorbar=None,
-                alpha=0.2,
-            )
 
-            ax.set_xlim(-0.5, 11.5)
-            ax.set_ylim(0, ax.get_ylim()[1])
-
-            ax.legend_.remove()
-
-            ax.set_xticklabels([calendar.month_name[i] for i in range(1, 13)])
-            # ax.set_xlabel("Month of Year", fontsize=14, labelpad=12)
-            ax.set_xlabel("")
-            ax.set_ylabel("Tickets Opened", fontsize=12, labelpad=15)
-            ax.tick_params(axis="both", length=0)
-            ax.tick_params(axis="y", pad=10)
-
-            ax2 = fig.add_axes([0.119, 0.11, 0.76, 0.77])  # left, bottom, width, height
-            ax2.patch.set_alpha(0)
-
-            lplot = sns.lineplot(
-                data=df_monthly_grouped.query(
-                    f"(year_opened >= ({primary_year}) & year_opened < {current_year}) | (year_opened == {current_year} & month_opened < {current_month})"
-                ),
-                x="month_opened",
-                y="ticket_count",
-                hue="year_opened",
-                palette=custom_palette[:5],
-                ax=ax2,
-                errorbar=None,
-                alpha=1,
-                legend=True,
-            )
+@st.cache_resource
+def get_ticket_history():
+    return TicketHistory()
 
-            ax2.set_xlim(0.125, 12)
-            ax2.set_ylim(0, ax.get_ylim()[1])
-
-            handles, labels = ax2.get_legend_handles_labels()
-            handles = handles[::-1]
-            labels = labels[::-1]
-            legend = ax2.legend(
-                handles,
-                labels,
-                # loc="best",
-                facecolor="white",
-                framealpha=1,
-                bbox_to_anchor=(0.9, 0.728),
-            )
-            # legend.set_title("Year")
-            legend.get_title().set_fontsize(12)
-            legend.get_frame().set_linewidth(0.25)
-
-            ax2.set_xticklabels([])
-            ax2.set_yticklabels([])
-            ax2.set_xlabel("")
-            ax2.set_ylabel("")
-            ax2.tick_params(axis="both", length=0)
-
-            if current_month != 1:
-                ax2.axvline(
-                    x=current_month - 0.75,
-                    linestyle="--",
-                    color="red",
-                    ymin=0,
-                    ymax=0.95,
-                )
-
-            ax2.grid(color="k", linestyle="-", axis="y", alpha=0.1)
-
-            plt.suptitle(
-                f"Number of Zendesk Tickets Opened per Month {current_year - 4} - {current_year}",
-                fontsize=14,
-                ha="left",
-                va="top",
-                x=0.12,
-                y=0.93,
-            )
 
-            sns.despine(bottom=True, left=True)
+def merge_into_history(digest, file, profiler=NO_PROFILER):
+    tickets = load_tickets(digest, file, _profiler=profiler)
+    with profiler.stage("history.merge"):
+        update = get_ticket_history().merge(tickets, digest)
+    if update.inserted or update.updated:
+        st.caption(
+            f"Ticket history: {update.inserted} new and {update.updated} updated tickets across {len(update.months)} months."
+        )
+    if not update.full_scan:
+        st.caption(
+            f"Only tickets updated since the previous export were compared, so edits that didn't change a ticket's update date (such as bulk renames) are not in the history yet. Every ticket is compared at least once every {FULL_SCAN_EVERY} merges."
+        )
+    return update.cube, f"history-{update.revision}", update.close_time_sketch
 
-            if not interactive_charts:
-                st.pyplot(fig=fig)
 
-            download_tab_1_button = st.empty()
-            download_tab_1_button.button(
-                "Download This Figure", disabled=True, key="tab1_download"
-            )
+@st.cache_resource
+def get_figure_cache():
+    return FigureCache(directory=DEFAULT_DISK_DIR)
 
-            if download_figs:
-                plt.savefig("tickets_per_month.png", dpi=300, bbox_inches="tight")
-                download_tab_1_button.empty()
-                download_file_path = "tickets_per_month.png"
-                css = f"""
-                    <style>
-                    .download-button {{
-                        text-decoration: none;
-                        padding: 6px 12px;
-                        background-color: transparent;
-                        color: white !important;
-                        border-radius: 4px;
-                        border: 0.5px solid #D3D3D3 !important;
-                        cursor: pointer;
-                        display: inline-block;
-                        transition: background-color 0s, border-color 0s, color 0s;
-                    }}
-                    .download-button:hover {{
-                        border-color: red !important;
-                        color: red !important;
-                        text-decoration: none;
-                    }}
-                    .download-button:active {{
-                        text-decoration: none;
-                    }}
-                    </style>
-                    
-                    <a href="data:application/octet-stream;base64,{get_base64_encoded_file(download_file_path)}" download="tickets_per_month.png" class="download-button">Download This Figure</a>
-                    """
-                # TODO: can prolly remove css from other buttons, not sure why but it works
-                st.markdown(css, unsafe_allow_html=True)
-
-        with col2:
-            value = df_monthly_grouped.query(
-                "`year_opened` == @current_year and `month_opened` == @current_month - 1"
-            ).ticket_count.squeeze()
-
-            delta_month = round(
-                (
-                    df_monthly_grouped.query(
-                        "`year_opened` == @current_year and `month_opened` == @current_month - 1"
-                    ).ticket_count.squeeze()
-                    - df_monthly_grouped.query(
-                        "`year_opened` == @current_year and `month_opened` == @current_month - 2"
-                    ).ticket_count.squeeze()
-                )
-                / df_monthly_grouped.query(
-                    "`year_opened` == @current_year and `month_opened` == @current_month - 2"
-                ).ticket_count.squeeze()
-                * 100,
-                1,
-            )
 
-            delta_year = round(
-                (
-                    df_monthly_grouped.query(
-                        "`year_opened` == @current_year and `month_opened` == @current_month - 1"
-                    ).ticket_count.squeeze()
-                    - df_monthly_grouped.query(
-                        "`year_opened` == @current_year - 1 and `month_opened` == @current_month - 1"
-                    ).ticket_count.squeeze()
-                )
-                / df_monthly_grouped.query(
-                    "`year_opened` == @current_year - 1 and `month_opened` == @current_month - 1"
-                ).ticket_count.squeeze()
-                * 100,
-                1,
-            )
+@st.cache_resource
+def get_render_pool():
+    return make_render_pool()
 
-            st.metric(
-                label="No. Tickets",
-                value=value,
-                delta=f"{delta_month}%",
-                delta_color="inverse",
-                help=f"The number of tickets {'increased' if delta_month > 0 else 'decreased'} by {delta_month}% month over month and {'increased' if delta_year > 0 else 'decreased'} by {delta_year}% year over year.",
-            )
 
-            df_monthly_grouped_styled = df_monthly_grouped.rename(
-                columns={
-                    "year_opened": "Year",
-                    "month_opened": "Month",
-                    "ticket_count": "Ticket Count",
-                }
-            )
-            df_monthly_grouped_styled = df_monthly_grouped_styled[::-1].style.format(
-                {"Year": "{:.0f}"}
-            )
+@st.cache_resource
+def get_job_runner():
+    return JobRunner()
 
-            st.dataframe(
-                df_monthly_grouped_styled, use_container_width=True, hide_index=True
-            )
 
-    progress_bar.progress(20, text=progress_text)
+def submit_upload_job(blob, period, names, draw, profile=False):
+    # The job runs on a thread without a script context, so the caches and
+    # pool are looked up now.
+    snapshot_cache = get_snapshot_cache()
 
-    df3 = (
-        df.query("ticket_status == 'Closed' and year_opened >= @current_year - 4")
-        .groupby(by=["year_opened", "month_opened"])
-        .days_active.agg(np.mean)
-        .reset_index(name="average_days_active")
+    def load():
+        # Holds ``blob``, so it stays pinned while the job reads it.
+        return load_export(blob.path, blob.digest, snapshot_cache)
+
+    return get_job_runner().submit(
+        (blob.digest, period, tuple(names), draw),
+        partial(
+            precompute_report,
+            load=load,
+            period=period,
+            digest=blob.digest,
+            names=names,
+            result_cache=get_result_cache(),
+            figure_cache=get_figure_cache(),
+            pool=get_render_pool(),
+            draw=draw,
+        ),
+        profiler=Profiler() if profile else NO_PROFILER,
     )
 
-    df3["rounded_days_active"] = np.ceil(
-        df3["average_days_active"].dt.total_seconds() / (24 * 3600)
-    ).astype(int)
-
-    # with st.expander("Average days to close tickets"):
-    with tab2:
-        col1, col2 = st.columns([0.8, 0.2], gap="small")
-
-        with col1:
-            # Fig 2: Average tickets per month
-            fig, ax = plt.subplots(figsize=(13.6, 7))
-
-            bplot = sns.barplot(
-                data=df3,
-                x="month_opened",
-                y="rounded_days_active",
-                hue="year_opened",
-                palette=custom_palette,
-                ax=ax,
-                errorbar=None,
-                alpha=0.15,
-            )
 
-            ax.set_xlim(-0.5, 11.5)
-            ax.set_ylim(0, ax.get_ylim()[1])
-
-            ax.legend_.remove()
-
-            ax.set_xticklabels([calendar.month_name[i] for i in range(1, 13)])
-            # ax.set_xlabel("Month of Year", fontsize=14, labelpad=12)
-            ax.set_xlabel("")
-            ax.set_ylabel("Mean Days to Ticket Closure", fontsize=12, labelpad=15)
-            ax.tick_params(axis="both", length=0)
-            ax.tick_params(axis="y", pad=28)
-
-            ax2 = fig.add_axes([0.1, 0.11, 0.76, 0.77])  # left, bottom, width, height
-            ax2.patch.set_alpha(0)
-
-            lplot = sns.lineplot(
-                data=df3,
-                x="month_opened",
-                y="rounded_days_active",
-                hue="year_opened",
-                palette=custom_palette[:5],
-                ax=ax2,
-                errorbar=None,
-                alpha=1,
-                legend=True,
-            )
+def render_figures(figure_makers, dpi=200, profiler=NO_PROFILER, **params):
+    return render_cached(
+        figure_makers,
+        get_figure_cache(),
+        dpi=dpi,
+        pool=get_render_pool(),
+        profiler=profiler,
+        **params,
+    )
 
-            ax2.set_xlim(0.125, 12)
-            ax2.set_ylim(0, ax.get_ylim()[1])
-
-            handles, labels = ax2.get_legend_handles_labels()
-            handles = handles[::-1]
-            labels = labels[::-1]
-            ax2.legend(
-                handles,
-                labels,
-                # loc="best",
-                facecolor="white",
-                framealpha=1,
-                bbox_to_anchor=(0.9, 0.648),
-            )
-            legend.get_title().set_fontsize(12)
-            legend.get_frame().set_linewidth(0.25)
-
-            ax2.set_xticklabels([])
-            ax2.set_yticklabels([])
-            ax2.set_xlabel("")
-            ax2.set_ylabel("")
-            ax2.tick_params(axis="both", length=0)
-
-            # ax2.axvline(x=5.55, linestyle="--", color="red", ymin=0, ymax=0.95)
-            if current_month != 1:
-                ax2.axvline(
-                    x=current_month - 0.45,
-                    linestyle="--",
-                    color="red",
-                    ymin=0,
-                    ymax=0.95,
-                )
-
-            ax2.grid(color="k", linestyle="-", axis="y", alpha=0.1)
-
-            plt.suptitle(
-                f"Average Number of Days to Close Tickets per Month {current_year - 4} - {current_year}",
-                fontsize=14,
-                ha="left",
-                va="top",
-                x=0.1,
-                y=0.9,
-            )
 
-            sns.despine(bottom=True, left=True)
+def deferred_export(make_export, figure_makers, name, profile=False, **params):
+    # The returned callable runs when a download is clicked, on a thread
+    # without a script context, so the cache and pool are looked up now.
+    # Its timings arrive after the diagnostics panel is drawn, so they are
+    # only logged.
+    figure_cache = get_figure_cache()
+    pool = get_render_pool()
 
-            st.pyplot(fig=fig)
-            download_tab_2_button = st.empty()
-            download_tab_2_button.button(
-                "Download This Figure", disabled=True, key="tab2_download"
+    def export():
+        with Profiler(enabled=profile) as profiler:
+            pngs = render_cached(
+                figure_makers,
+                figure_cache,
+                dpi=EXPORT_DPI,
+                pool=pool,
+                profiler=profiler,
+                **params,
             )
+            with profiler.stage(f"export.{name}"):
+                exported = make_export(pngs)
+        if profile:
+            profiler.log(export=name)
+        return exported
 
-            if download_figs:
-                plt.savefig("average_days_to_close.png", dpi=300, bbox_inches="tight")
-                download_tab_2_button.empty()
-                download_file_path = "average_days_to_close.png"
-                st.markdown(
-                    f"""
-                    <style>
-                    .download-button {{
-                        text-decoration: none;
-                        padding: 6px 12px;
-                        background-color: transparent;
-                        color: white;
-                        border-radius: 4px;
-                        border: 2px solid #D3D3D3;
-                        cursor: pointer;
-                        display: inline-block;
-                        transition: background-color 0.3s, border-color 0.1s, color 0.1s;
-                    }}
-                    .download-button:hover {{
-                        border-color: red;
-                        color: red;
-                    }}
-                    </style>
-                    
-                    <a href="data:application/octet-stream;base64,{get_base64_encoded_file(download_file_path)}" download="average_days_to_close.png" class="download-button">Download This Figure</a>
-                    """,
-                    unsafe_allow_html=True,
-                )
-
-        with col2:
-            avg_days_value = df3.query(
-                "`year_opened` == @current_year and `month_opened` == @current_month - 1"
-            ).rounded_days_active.squeeze()
-
-            delta_month_change_metric = round(
-                (
-                    (
-                        df3.query(
-                            "`year_opened` == @current_year and `month_opened` == @current_month - 1"
-                        ).rounded_days_active.squeeze()
-                        - df3.query(
-                            "`year_opened` == @current_year and `month_opened` == @current_month - 2"
-                        ).rounded_days_active.squeeze()
-                    )
-                    / df3.query(
-                        "`year_opened` == @current_year and `month_opened` == @current_month - 2"
-                    ).rounded_days_active.squeeze()
-                )
-                * 100,
-                1,
-            )
+    return export
 
-            delta_year_change_metric = round(
-                (
-                    (
-                        df3.query(
-                            "`year_opened` == @current_year and `month_opened` == @current_month - 1"
-                        ).rounded_days_active.squeeze()
-                        - df3.query(
-                            "`year_opened` == @current_year - 1 and `month_opened` == @current_month - 1"
-                        ).rounded_days_active.squeeze()
-                    )
-                    / df3.query(
-                        "`year_opened` == @current_year - 1 and `month_opened` == @current_month - 1"
-                    ).rounded_days_active.squeeze()
-                )
-                * 100,
-                1,
-            )
-            st.metric(
-                label="Avg. Days to Close",
-                value=avg_days_value,
-                delta=f"{delta_month_change_metric}%",
-                delta_color="inverse",
-                help=f"The average number of days to close a ticket  {'increased' if delta_month_change_metric > 0 else 'decreased'} by {delta_month_change_metric}% month over month and  {'increased' if delta_year_change_metric > 0 else 'decreased'} by {delta_year_change_metric}% year over year.",
-            )
 
-            df3_styled = df3.drop(columns="average_days_active").rename(
-                columns={
-                    "year_opened": "Year",
-                    "month_opened": "Month",
-                    "rounded_days_active": "Days Active",
-                }
-            )
+def show_diagnostics(section, profiler, **metadata):
+    section.dataframe(
+        [
+            {
+                "Stage": timing["name"],
+                "Wall (ms)": round(timing["wall_seconds"] * 1000, 1),
+                "CPU (ms)": round(timing["cpu_seconds"] * 1000, 1),
+                "Peak (MiB)": None
+                if timing["peak_bytes"] is None
+                else round(timing["peak_bytes"] / 2**20, 2),
+            }
+            for timing in profiler.as_records()
+        ],
+        use_container_width=True,
+        hide_index=True,
+    )
+    section.download_button(
+        "Download Timings (JSON)",
+        data=profiler.to_json(**metadata),
+        file_name="stage_timings.json",
+        mime="application/json",
+        use_container_width=True,
+    )
+    profiler.log(**metadata)
 
-            df3_styled = df3_styled[::-1].style.format({"year_opened": "{:.0f}"})
 
-            st.dataframe(df3_styled, use_container_width=True, hide_index=True)
+METRIC_HELP = {
+    "tickets_per_month": "The number of tickets {month_change} by {month_delta}% month over month and {year_change} by {year_delta}% year over year.",
+    "average_days_to_close": "The average number of days to close a ticket  {month_change} by {month_delta}% month over month and  {year_change} by {year_delta}% year over year.",
+    "count_product_tickets": "The number of tickets for {label} {month_change} by {month_delta}% month over month",
+    "count_client_tickets": "The number of tickets for {label} {month_change} by {month_delta}% month over month",
+    # "average_days_by_product": "The average number of days to close out {label} {month_change} by {month_delta}% month over month",
+}
 
-    progress_bar.progress(40, text=progress_text)
 
-    # also consider start date here
-    products_of_interest = list(
-        df.query("year_opened >= 2022 and product_type.notnull()")
-        .product_type.value_counts(dropna=True)[:6]
-        .reset_index()
-        .product_type
+def show_metric(result, metric):
+    # Deltas against a month without data (or with none to compare) are NaN.
+    month_known = math.isfinite(metric.month_delta)
+    help_text = METRIC_HELP.get(result.tab.name)
+    if help_text is not None:
+        known = month_known and (
+            "{year_delta}" not in help_text or math.isfinite(metric.year_delta)
+        )
+        help_text = (
+            help_text.format(
+                label=metric.label,
+                month_change="increased" if metric.month_delta > 0 else "decreased",
+                month_delta=metric.month_delta,
+                year_change="increased" if metric.year_delta > 0 else "decreased",
+                year_delta=metric.year_delta,
+            )
+            if known
+            else None
+        )
+    st.metric(
+        label=metric.label,
+        value=metric.value,
+        delta=f"{metric.month_delta}%" if month_known else None,
+        delta_color="inverse",
+        help=help_text,
     )
 
-    if "Other" in products_of_interest:
-        products_of_interest.remove("Other")
-        products_of_interest.append("Other")
+
+def show_table(result):
+    if result.tab.name == "tickets_per_month":
+        table = result.frame.rename(
+            columns={
+                "year_opened": "Year",
+                "month_opened": "Month",
+                "ticket_count": "Ticket Count",
+            }
+        )
+        table = table[::-1].style.format({"Year": "{:.0f}"})
+    elif result.tab.name == "average_days_to_close":
+        table = result.frame.drop(columns="average_days_active").rename(
+            columns={
+                "year_opened": "Year",
+                "month_opened": "Month",
+                "rounded_days_active": "Days Active",
+            }
+        )
+        table = table[::-1].style.format({"year_opened": "{:.0f}"})
+    elif result.tab.dimension is None and "closed_count" in result.frame:
+        # A close-time quantile (see coe_kpi.stats).
+        table = result.frame[
+            ["year_opened", "month_opened", result.tab.value, "closed_count"]
+        ].rename(
+            columns={
+                "year_opened": "Year",
+                "month_opened": "Month",
+                result.tab.value: "Days Active",
+                "closed_count": "Closed Tickets",
+            }
+        )
+        table = table[::-1]
     else:
-        products_of_interest.append("Other")
+        return
+    st.dataframe(table, use_container_width=True, hide_index=True)
+
+
+def show_tab(result, chart, export):
+    """Draw one tab: its chart and download button, then its KPIs and table.
+
+    ``chart`` is PNG bytes or an interactive Altair chart.
+    """
+    name = result.tab.name
+    col1, col2 = st.columns([0.8, 0.2], gap="small")
+
+    with col1:
+        if isinstance(chart, bytes):
+            st.image(chart, use_container_width=True)
+        else:
+            st.altair_chart(chart, use_container_width=True)
+        figure_download_button(export, name, key=f"{name}_download")
+
+    with col2:
+        for metric in result.metrics:
+            show_metric(result, metric)
+        show_table(result)
+
+
+def load_report(data, archived, use_history, period, profiler):
+    """Build the ``ReportEngine`` for an archived report or the ticket history.
+
+    ``data`` is the uploaded ``Blob`` unless a report is ``archived``. A
+    ``period`` of None reports on the cube's latest month.
+    """
+    if archived is not None:
+        archived_report = open_archived_report(archived)
+        if period.date_range is None:
+            # Archive payloads are materialized for the default window only.
+            return archived_report, ReportEngine(
+                archived_report.cube,
+                period,
+                archived_report.digest,
+                products=archived_report.products,
+                clients=archived_report.clients,
+                aggregates=archived_report.aggregates,
+                profiler=profiler,
+                cache=get_result_cache(),
+                close_time_sketch=archived_report.close_time_sketch,
+            )
+        digest, cube = archived_report.digest, archived_report.cube
+        close_time_sketch = archived_report.close_time_sketch
+    else:
+        # Charts are drawn from the whole history, so it (not the upload) is
+        # what the figure caches are keyed on.
+        cube, digest, close_time_sketch = merge_into_history(
+            data.digest, data.path, profiler
+        )
+        if period is None:
+            period = ReportPeriod.latest(cube)
+
+    report_range = None
+    if period.date_range is not None:
+        report_range = get_report_range(digest, cube)
+    return None, ReportEngine(
+        cube,
+        period,
+        digest,
+        report_range=report_range,
+        profiler=profiler,
+        cache=get_result_cache(),
+        close_time_sketch=close_time_sketch,
+    )
 
-    df4 = df.copy().query("`product_type`.notnull()")
-    df4.loc[~df4.product_type.isin(products_of_interest), "product_type"] = "Other"
 
-    df5 = (
-        df4.groupby(by=["year_opened", "month_opened", "product_type"])
-        .product_type.count()
-        .reset_index(name="count")
-    )
+def create_figures(
+    data,
+    current_month=None,
+    download_figs=False,
+    interactive_charts=False,
+    use_history=False,
+    archived=None,
+    profiler=NO_PROFILER,
+    current_year=None,
+    date_range=None,
+    statistic="mean",
+):
+    if date_range is not None:
+        period = ReportPeriod.for_range(date_range)
+    elif current_year is not None:
+        period = ReportPeriod(current_year, current_month)
+    else:
+        # Uploads report on their latest month once they are loaded.
+        period = None
+
+    # Plain uploads are prepared by a background job, so the page stays
+    # usable while they load; archives and the history are quick to open.
+    background = archived is None and not use_history
+    if not background:
+        progress_text = "Loading..."
+        progress_bar = st.progress(0, progress_text)
 
-    df5["year_month"] = df5.year_opened.astype(str) + "-" + df5.month_opened.astype(str)
-    df5["year_month_style"] = pd.to_datetime(df5["year_month"], format="%Y-%m")
-    df5["month_year_style"] = df5.year_month_style.dt.strftime("%b. %Y").apply(
-        lambda x: x.replace("May.", "May")
+    # TODO: make a 'reset_date' button so that date can be restored to normal if messed around with a bit too much
+    # have to consider that charts are different dates, so actually 'reset' would just make the appearance
+    # the same as the start, but the charts would also be the same as the start, ie. not following the appearnce
+    report_tabs = TAB_VARIANTS[statistic]
+    tabs = st.tabs(
+        [tab.title for tab in report_tabs],
+        key="report_tab",
+        on_change="rerun",
     )
+    # Only the open tab is aggregated and drawn. High-DPI exports are rendered
+    # when their download button is clicked.
+    open_tabs = {
+        tab.name: st_tab for tab, st_tab in zip(report_tabs, tabs) if st_tab.open
+    }
+    names = [tab.name for tab in report_tabs]
 
-    # with st.expander("Ticket count by product"):
-    with tab3:
-        col1, col2 = st.columns([0.8, 0.2], gap="small")
-
-        with col1:
-            # Fig 3: Average tickets by product per month
-            fig, ax = plt.subplots(figsize=(30, 13))
-
-            brplot = sns.barplot(
-                data=df5.query(
-                    f"year_month >= '{current_year - 1}-1' and year_month < '{current_year}-{current_month}'"
-                ),
-                x="month_year_style",
-                y="count",
-                hue="product_type",
-                palette=custom_palette,
-                errorbar=None,
-                hue_order=products_of_interest,
-            )
+    if background:
+        show_upload_report(
+            data, period, names, open_tabs, download_figs, interactive_charts, profiler
+        )
+        return
 
-            legend = ax.legend(
-                facecolor="white",
-                framealpha=1,
-                fontsize=16,
-                loc="upper left",
-                bbox_to_anchor=(0.01, 1.0051),
-            )
-            legend.get_frame().set_linewidth(0.25)
-
-            ax.set_xlabel("")
-            ax.set_ylabel("Count of Tickets", fontsize=18, labelpad=18)
-            ax.set_xticklabels(ax.get_xticklabels(), fontsize=14)
-            ax.set_yticks(ax.get_yticks())
-            ax.set_yticklabels(ax.get_yticklabels(), fontsize=14)
-            ax.tick_params(axis="both", length=0)
-
-            plt.suptitle(
-                f"Number of Tickets per Month by Product {current_year - 1} - Present",
-                x=0.113,
-                y=0.93,
-                ha="left",
-                va="bottom",
-                fontsize=20,
+    with profiler.stage("load"):
+        archived_report, engine = load_report(
+            data, archived, use_history, period, profiler
+        )
+    # One step each for loading, aggregating and drawing.
+    progress_steps = iter([33, 67, 100])
+    progress_bar.progress(next(progress_steps), text=progress_text)
+
+    show_range_caption(engine)
+    results = {name: engine.tab(name) for name in open_tabs}
+    progress_bar.progress(next(progress_steps), text=progress_text)
+
+    if interactive_charts:
+        # Drawn in the browser from the chart aggregates; no PNGs needed.
+        with profiler.stage("render.interactive"):
+            charts = {name: engine.chart(name) for name in open_tabs}
+    else:
+        charts = {}
+        if archived_report is not None:
+            # Archived charts never change, so they are stored with the
+            # archive; close-time quantile variants aren't.
+            with profiler.stage("render.archive"):
+                charts = {
+                    name: get_result_cache().get_or_compute(
+                        ("archive_figure", str(archived_report.directory), name),
+                        partial(get_archive_store().figure_png, archived_report, name),
+                    )
+                    for name in open_tabs
+                    if name in archived_report.aggregates
+                }
+        unstored = {
+            name: result.figure.make
+            for name, result in results.items()
+            if name not in charts
+        }
+        if unstored:
+            charts.update(
+                render_figures(unstored, profiler=profiler, **engine.render_params)
             )
+    progress_bar.progress(next(progress_steps), text=progress_text)
 
-            ax.grid(color="k", linestyle="-", axis="y", alpha=0.1)
-            sns.despine(bottom=True, left=True)
-
-            st.pyplot(fig=fig)
-            download_tab_3_button = st.empty()
-            download_tab_3_button.button(
-                "Download This Figure", disabled=True, key="tab3_download"
-            )
+    figure_exports = {}
+    if download_figs:
+        figure_exports = prepare_downloads(engine, names, open_tabs, profiler)
 
-            if download_figs:
-                plt.savefig("count_product_tickets.png", dpi=300, bbox_inches="tight")
-                download_tab_3_button.empty()
-                download_file_path = "count_product_tickets.png"
-                st.markdown(
-                    f"""
-                    <style>
-                    .download-button {{
-                        text-decoration: none;
-                        padding: 6px 12px;
-                        background-color: transparent;
-                        color: white;
-                        border-radius: 4px;
-                        border: 2px solid #D3D3D3;
-                        cursor: pointer;
-                        display: inline-block;
-                        transition: background-color 0.3s, border-color 0.1s, color 0.1s;
-                    }}
-                    .download-button:hover {{
-                        border-color: red;
-                        color: red;
-                    }}
-                    </style>
-                    
-                    <a href="data:application/octet-stream;base64,{get_base64_encoded_file(download_file_path)}" download="count_product_tickets.png" class="download-button">Download This Figure</a>
-                    """,
-                    unsafe_allow_html=True,
-                )
-
-        with col2:
-            prev_mo_vals = [
-                df5.query(
-                    f"`year_opened` == {current_year} and `month_opened` == {current_month - 2} and `product_type` == @i"
-                    # "`year_opened` == @current_year and `month_opened` == @current_month - 2 and `product_type` == @i"
-                )["count"].squeeze()
-                for i in products_of_interest
-            ]
-            curr_mo_vals = [
-                df5.query(
-                    f"`year_opened` == {current_year} and `month_opened` == {current_month - 1} and `product_type` == @i"
-                )["count"].squeeze()
-                for i in products_of_interest
-            ]
-            delta_vals = [
-                round((curr - prev) / prev * 100, 1)
-                for prev, curr in zip(prev_mo_vals, curr_mo_vals)
-            ]
-
-            for idx, i in enumerate(curr_mo_vals):
-                st.metric(
-                    label=products_of_interest[idx],
-                    value=i,
-                    delta=f"{delta_vals[idx]}%",
-                    delta_color="inverse",
-                    help=f"The number of tickets for {products_of_interest[idx]} {'increased' if delta_vals[idx] > 0 else 'decreased'} by {delta_vals[idx]}% month over month",
-                )
-
-    progress_bar.progress(60, text=progress_text)
-
-    df6 = df.copy()
-    df6.loc[
-        df6.client_name == "The Red Sea Development Co., (TRSDC)", "client_name"
-    ] = "TRSDC"
-    # this might be something to consider if including a start date
-    clients_of_interest = list(
-        df6.query("year_opened >= 2022")
-        .client_name.value_counts(dropna=True)[:5]
-        .reset_index()
-        .client_name
-    ) + ["Other"]
-    df6.loc[~df6.client_name.isin(clients_of_interest), "client_name"] = "Other"
-    df7 = (
-        df6.groupby(by=["year_opened", "month_opened", "client_name"])
-        .client_name.count()
-        .reset_index(name="count")
-    )
-    df7["year_month"] = df7.year_opened.astype(str) + "-" + df7.month_opened.astype(str)
-    df7["year_month_style"] = pd.to_datetime(df7["year_month"], format="%Y-%m")
-    df7["month_year_style"] = df7.year_month_style.dt.strftime("%b. %Y").apply(
-        lambda x: x.replace("May.", "May")
-    )
+    for name, st_tab in open_tabs.items():
+        with st_tab:
+            show_tab(results[name], charts[name], figure_exports.get(name))
 
-    # with st.expander("Ticket count by client"):
-    with tab4:
-        col1, col2 = st.columns([0.8, 0.2], gap="small")
-
-        with col1:
-            # Fig 4: Average tickets by client per month
-            fig, ax = plt.subplots(figsize=(30, 13))
-
-            brplot = sns.barplot(
-                data=df7.query(
-                    f"year_month >= '{current_year - 1}-1' and year_month < '{current_year}-{current_month}'"
-                ),
-                x="month_year_style",
-                y="count",
-                hue="client_name",
-                palette=custom_palette,
-                # palette='viridis',
-                errorbar=None,
-                hue_order=clients_of_interest,
-            )
+    progress_bar.empty()
 
-            legend = ax.legend(
-                facecolor="white",
-                framealpha=1,
-                fontsize=16,
-                loc="upper left",
-                bbox_to_anchor=(0.01, 1.0051),
-            )
-            legend.get_frame().set_linewidth(0.25)
-
-            ax.set_xlabel("")
-            ax.set_ylabel("Count of Tickets", fontsize=18, labelpad=18)
-            ax.set_xticklabels(ax.get_xticklabels(), fontsize=14)
-            ax.set_yticks(ax.get_yticks())
-            ax.set_yticklabels(ax.get_yticklabels(), fontsize=14)
-            ax.tick_params(axis="both", length=0)
-
-            plt.suptitle(
-                # "The recent influx of tickets is largely due to a significant increase in the number of tickets coming from NEOM and TRSDC in particular",
-                f"Number of Tickets per Month by Client {current_year - 1} - Present",
-                x=0.1121,
-                y=0.93,
-                ha="left",
-                va="bottom",
-                fontsize=20,
-            )
 
-            ax.grid(color="k", linestyle="-", axis="y", alpha=0.1)
-            sns.despine(bottom=True, left=True)
+def prepare_downloads(engine, names, open_tabs, profiler):
+    """Add the "Download All Figures" button; return each open tab's export."""
+    with profiler.stage("export.prepare"):
+        export_makers = engine.figure_makers(names)
+    figure_exports = {
+        name: deferred_export(
+            itemgetter(name),
+            {name: export_makers[name]},
+            name,
+            profile=profiler.enabled,
+            **engine.render_params,
+        )
+        for name in open_tabs
+    }
+    download_section.download_button(
+        "Download All Figures",
+        data=deferred_export(
+            zip_pngs,
+            export_makers,
+            "zip",
+            profile=profiler.enabled,
+            **engine.render_params,
+        ),
+        file_name="figures.zip",
+        mime="application/zip",
+        use_container_width=True,
+    )
+    return figure_exports
 
-            st.pyplot(fig=fig)
-            download_tab_4_button = st.empty()
-            download_tab_4_button.button(
-                "Download This Figure", disabled=True, key="tab4_download"
-            )
 
-            if download_figs:
-                plt.savefig("count_client_tickets.png", dpi=300, bbox_inches="tight")
-                download_tab_4_button.empty()
-                download_file_path = "count_client_tickets.png"
-                st.markdown(
-                    f"""
-                    <style>
-                    .download-button {{
-                        text-decoration: none;
-                        padding: 6px 12px;
-                        background-color: transparent;
-                        color: white;
-                        border-radius: 4px;
-                        border: 2px solid #D3D3D3;
-                        cursor: pointer;
-                        display: inline-block;
-                        transition: background-color 0.3s, border-color 0.1s, color 0.1s;
-                    }}
-                    .download-button:hover {{
-                        border-color: red;
-                        color: red;
-                    }}
-                    </style>
-                    
-                    <a href="data:application/octet-stream;base64,{get_base64_encoded_file(download_file_path)}" download="count_client_tickets.png" class="download-button">Download This Figure</a>
-                    """,
-                    unsafe_allow_html=True,
-                )
-
-        with col2:
-            prev_mo_vals = [
-                df7.query(
-                    f"`year_opened` == {current_year} and `month_opened` == {current_month - 2} and `client_name` == @i"
-                )["count"].squeeze()
-                for i in clients_of_interest
-            ]
-
-            curr_mo_vals = [
-                df7.query(
-                    f"`year_opened` == {current_year} and `month_opened` == {current_month - 1} and `client_name` == @i"
-                )["count"].squeeze()
-                for i in clients_of_interest
-            ]
-
-            delta_vals = [
-                round((curr - prev) / prev * 100, 1)
-                for prev, curr in zip(prev_mo_vals, curr_mo_vals)
-            ]
-
-            for idx, i in enumerate(curr_mo_vals):
-                st.metric(
-                    label=clients_of_interest[idx],
-                    value=i,
-                    delta=f"{delta_vals[idx]}%",
-                    delta_color="inverse",
-                    help=f"The number of tickets for {clients_of_interest[idx]} {'increased' if delta_vals[idx] > 0 else 'decreased'} by {delta_vals[idx]}% month over month",
-                )
-
-    progress_bar.progress(80, text=progress_text)
-
-    df8 = df.query("ticket_status == 'Closed' and product_type.notnull()")
-    df8.loc[~df8.product_type.isin(products_of_interest), "product_type"] = "Other"
-
-    df8 = (
-        df8.groupby(by=["year_opened", "month_opened", "product_type"])
-        .days_active.agg(np.mean)
-        .reset_index(name="average_days_active")
-    )
-    df8["rounded_days_active"] = np.ceil(
-        df8["average_days_active"].dt.total_seconds() / (24 * 3600)
-    ).astype(int)
-    df8["year_month"] = df8.year_opened.astype(str) + "-" + df8.month_opened.astype(str)
-    df8["year_month_style"] = pd.to_datetime(df8["year_month"], format="%Y-%m")
-    df8["month_year_style"] = df8.year_month_style.dt.strftime("%b. %Y").apply(
-        lambda x: x.replace("May.", "May")
-    )
+def show_upload_report(
+    data, period, names, open_tabs, download_figs, interactive_charts, profiler
+):
+    """Show an upload's tabs as its background job finishes them."""
+    with profiler.stage("load.submit"):
+        job = submit_upload_job(
+            data, period, names, draw=not interactive_charts, profile=profiler.enabled
+        )
+    for name in open_tabs:
+        job.want(name)
+
+    engine = job.get("engine")
+    if engine is not None:
+        show_range_caption(engine)
+
+    figure_exports = {}
+    if download_figs and engine is not None:
+        figure_exports = prepare_downloads(engine, names, open_tabs, profiler)
+
+    for name, st_tab in open_tabs.items():
+        with st_tab:
+            ready = job.get(name)
+            if ready is None:
+                show_pending_tab(job, name, names)
+                continue
+            result, png = ready
+            chart = png
+            if interactive_charts:
+                with profiler.stage("render.interactive"):
+                    chart = engine.chart(name)
+            show_tab(result, chart, figure_exports.get(name))
+
+    # The job's own stages, timed on its worker thread.
+    for timing in job.profiler.as_records():
+        profiler.record(
+            f"job.{timing['name']}",
+            timing["wall_seconds"],
+            timing["cpu_seconds"],
+        )
 
-    # with st.expander("Average days to close by product"):
-    with tab5:
-        col1, col2 = st.columns([0.8, 0.2], gap="small")
-
-        with col1:
-            # Fig 5: Average tickets by client per month
-            fig, ax = plt.subplots(figsize=(30, 13))
-
-            brplot = sns.barplot(
-                data=df8.query(
-                    f"year_month >= '{current_year - 1}-1' and year_month < '{current_year}-{current_month}'"
-                ),
-                x="month_year_style",
-                y="rounded_days_active",
-                hue="product_type",
-                palette=custom_palette,
-                errorbar=None,
-                hue_order=products_of_interest,
-            )
 
-            legend = ax.legend(
-                facecolor="white",
-                framealpha=1,
-                fontsize=16,
-                loc="upper right",
-                bbox_to_anchor=(0.95, 1),
-            )
-            legend.get_frame().set_linewidth(0.25)
-
-            ax.set_xlabel("")
-            ax.set_ylabel("Mean days to ticket closure", fontsize=18, labelpad=18)
-            ax.set_xticklabels(ax.get_xticklabels(), fontsize=14)
-            ax.set_yticks(ax.get_yticks())
-            ax.set_yticklabels(ax.get_yticklabels(), fontsize=14)
-            ax.tick_params(axis="both", length=0)
-
-            plt.suptitle(
-                f"Average Number of Days to Close Tickets each Month by Product {current_year - 1} - Present",
-                x=0.113,
-                y=0.93,
-                ha="left",
-                va="bottom",
-                fontsize=20,
-            )
+def show_range_caption(engine):
+    ticket_count = engine.ticket_count()
+    if ticket_count is not None:
+        st.caption(f"{ticket_count} tickets were opened in the selected range.")
+
+
+def show_pending_tab(job, name, names):
+    """Stand in for a tab the job hasn't finished, rerunning the page once it has."""
+    if job.state == "failed":
+        st.error(f"The report could not be built: {job.error}")
+        if st.button("Try Again", key=f"{name}_retry"):
+            get_job_runner().discard(job.key)
+            st.rerun()
+        return
+
+    @st.fragment(run_every=JOB_POLL_SECONDS)
+    def poll():
+        if job.has(name) or job.state == "failed":
+            st.rerun()
+        ready = sum(job.has(tab_name) for tab_name in names)
+        st.info(
+            f"Preparing {TABS_BY_NAME[name].title}... {ready} of {len(names)} figures ready.",
+            icon="⏳",
+        )
 
-            ax.grid(color="k", linestyle="-", axis="y", alpha=0.1)
-            sns.despine(bottom=True, left=True)
+    poll()
 
-            st.pyplot(fig=fig)
-            download_tab_5_button = st.empty()
-            download_tab_5_button.button(
-                "Download This Figure", disabled=True, key="tab5_download"
-            )
 
-            if download_figs:
-                plt.savefig("average_days_by_product.png", dpi=300, bbox_inches="tight")
-                download_tab_5_button.empty()
-                download_file_path = "average_days_by_product.png"
-                st.markdown(
-                    f"""
-                    <a href="data:application/octet-stream;base64,{get_base64_encoded_file(download_file_path)}" download="average_days_by_product.png" class="download-button">Download This Figure</a>
-                    """,
-                    unsafe_allow_html=True,
-                )
-
-        with col2:
-            prev_mo_vals = [
-                df8.query(
-                    f"`year_opened` == {current_year} and `month_opened` == {current_month - 2} and `product_type` == @i"
-                )["rounded_days_active"].squeeze()
-                for i in products_of_interest
-            ]
-
-            curr_mo_vals = [
-                df8.query(
-                    f"`year_opened` == {current_year} and `month_opened` == {current_month - 1} and `product_type` == @i"
-                ).rounded_days_active.squeeze()
-                for i in products_of_interest
-            ]
-
-            delta_vals = [
-                round((curr - prev) / prev * 100, 1)
-                for prev, curr in zip(prev_mo_vals, curr_mo_vals)
-            ]
-            for idx, i in enumerate(curr_mo_vals):
-                st.metric(
-                    label=products_of_interest[idx],
-                    value=i,
-                    delta=f"{delta_vals[idx]}%",
-                    delta_color="inverse",
-                    # help=f"The average number of days to close out {products_of_interest[idx]} {'increased' if delta_vals[idx] > 0 else 'decreased'} by {delta_vals[idx]}% month over month",
-                )
-
-    progress_bar.progress(100, text=progress_text)
+def clear_archived_report():
+    st.session_state.pop("archived_report", None)
 
-    if download_figs:
-        figures = [
-            "tickets_per_month.png",
-            "average_days_to_close.png",
-            "count_product_tickets.png",
-            "count_client_tickets.png",
-            "average_days_by_product.png",
-        ]
-
-        with zipfile.ZipFile("figures.zip", "w") as zipf:
-            for figure in figures:
-                zipf.write(figure)
-
-        download_section.markdown(
-            f"""
-        <style>
-        .download-all-button {{
-            text-decoration: none !important;
-            padding: 6px 12px;
-            background-color: transparent;
-            color: white !important;
-            border-radius: 4px;
-            border: 2px solid #D3D3D3;
-            cursor: pointer;
-            display: inline-block;
-            transition: background-color 0s, border-color 0s, color 0s;
-            width: 100%;
-            box-sizing: border-box;
-            text-align: center;
-        }}
-        .download-all-button:hover {{
-            text-decoration: none !important;
-            border-color: red;
-            color: red !important;
-        }}
-        </style>
-        <a href="data:application/zip;base64,{get_base64_encoded_file("figures.zip")}" download="figures.zip" class="download-all-button">Download All Figures</a>
-        """,
-            unsafe_allow_html=True,
-        )
-        temp_download_all_button.empty()
 
-    progress_bar.empty()
+def keep_open_tab():
+    # The close-time tabs are titled after the statistic, so reopen the same
+    # tab under its new title.
+    positions = {
+        tab.title: position
+        for tabs in TAB_VARIANTS.values()
+        for position, tab in enumerate(tabs)
+    }
+    position = positions.get(st.session_state.get("report_tab"))
+    if position is not None:
+        tabs = TAB_VARIANTS[st.session_state.statistic]
+        st.session_state.report_tab = tabs[position].title
 
-    return
 
+st.subheader(
+    "Input an Excel, CSV or JSON Lines export below or select an archived report from the sidebar"
+)
 
-st.subheader("Input Excel file below or select an archived report from the sidebar")
 
-uploaded_file = st.file_uploader(label="hidden label", label_visibility="collapsed")
+uploaded_file = st.file_uploader(
+    label="hidden label",
+    label_visibility="collapsed",
+    on_change=clear_archived_report,
+)
 file_removed = False
 
 current_year = datetime.now().year
@@ -1114,73 +623,135 @@ current_month = datetime.now().month
 # st.sidebar.divider()
 
 
-# st.sidebar.subheader("Interactive Charts:")
-# interactive_charts_check = st.sidebar.checkbox(
-#     "Enable Interactive Charts",
-#     help="Check to enable interactive charts. Does not support downloading of interactive charts, will instead download static charts if download is enabled.",
-# )
+st.sidebar.subheader("Interactive Charts:")
+interactive_charts_check = st.sidebar.checkbox(
+    "Enable Interactive Charts",
+    help="Check to draw the charts in the browser, with tooltips, hover highlighting and zoom (drag to pan, scroll to zoom, double-click to reset). Does not support downloading of interactive charts, will instead download static charts if download is enabled.",
+)
+
+st.sidebar.divider()
 
-st.sidebar.subheader("Configure Start Date :red[NOT ACTIVE YET]")
+st.sidebar.subheader("Days to Close:")
+statistic_select = st.sidebar.selectbox(
+    label="Statistic",
+    options=list(STATISTICS),
+    format_func=lambda name: STATISTICS[name].title,
+    key="statistic",
+    on_change=keep_open_tab,
+    help="Please select how the days-to-close tabs summarize each month. Medians and percentiles are not skewed by a few long-running tickets like the average is.",
+)
+
+st.sidebar.divider()
+
+st.sidebar.subheader("Custom Date Range:")
+custom_range_checkbox = st.sidebar.checkbox(
+    "Enable Custom Date Range",
+    help="Check to limit the figures to the months selected below. Top products and clients are ranked within the range, and the KPIs compare its last month with the month and year before.",
+)
+
+st.sidebar.subheader("Configure Start Date")
 
 start_month = st.sidebar.selectbox(
     label="Starting Month",
     options=([calendar.month_name[i] for i in range(1, 13)]),
     index=0,
     help="Please select a starting month for the figures. ",
+    disabled=not custom_range_checkbox,
 )
 start_year = st.sidebar.selectbox(
     label="Starting Year",
     options=([current_year - i for i in range(0, 10)]),
     index=1,
     help="Please select a starting year for the figures.",
+    disabled=not custom_range_checkbox,
 )
-st.sidebar.subheader("Configure End Date :red[NOT ACTIVE YET]")
+st.sidebar.subheader("Configure End Date")
 end_month = st.sidebar.selectbox(
     label="Ending Month",
     options=([calendar.month_name[i] for i in range(1, 13)]),
     index=current_month - 1,
     help="Please select an ending month for the figures.",
+    disabled=not custom_range_checkbox,
 )
 end_year = st.sidebar.selectbox(
     label="Ending Year",
     options=([current_year - i for i in range(0, 10)]),
     index=0,
     help="Please select an ending year for the figures.",
+    disabled=not custom_range_checkbox,
 )
 
 st.sidebar.write(f"Selected Range:")
 st.sidebar.write(f"{start_month}, {start_year} - {end_month}, {end_year}")
 
+date_range = None
+if custom_range_checkbox:
+    start_key = int(month_key(start_year, list(calendar.month_name).index(start_month)))
+    end_key = int(month_key(end_year, list(calendar.month_name).index(end_month)))
+    if start_key > end_key:
+        st.sidebar.error("The starting date must not be after the ending date.")
+    else:
+        date_range = (start_key, end_key)
+
 st.sidebar.divider()
 
 st.sidebar.subheader("Figure Downloads:")
 download_section = st.sidebar.container()
 download_checkbox = download_section.checkbox(
     "Enable Figure Downloads",
-    help="Check to enable figure downloads. Slows down load time if enabled. Will enable both individual figure downloads as well as downloading all figures at once.",
+    help="Check to enable figure downloads. High-resolution figures are generated when a download is clicked. Will enable both individual figure downloads as well as downloading all figures at once.",
+)
+
+st.sidebar.divider()
+
+st.sidebar.subheader("Ticket History:")
+history_checkbox = st.sidebar.checkbox(
+    "Merge Uploads into History",
+    help=f"Check to merge each uploaded export into a stored ticket history keyed by ticket ID. Only new tickets and tickets updated since the last merge are applied, with every ticket compared at least once every {FULL_SCAN_EVERY} merges. The report covers the whole history, including tickets later exports no longer list.",
+)
+
+st.sidebar.divider()
+
+st.sidebar.subheader("Diagnostics:")
+diagnostics_checkbox = st.sidebar.checkbox(
+    "Show Stage Timings",
+    help="Check to time each step of building the report (loading, aggregating, drawing and exporting). Memory tracing slows the report down while enabled.",
 )
+diagnostics_section = st.sidebar.container()
 
 st.sidebar.divider()
 
 st.sidebar.subheader("Archived Reports:")
-if st.sidebar.button(label="April 2023", use_container_width=True):
-    create_figures(
-        data="coe_kpi_04_2023.xlsx", current_month=5, download_figs=download_checkbox
-    )
-    file_removed = True
-if st.sidebar.button(label="May 2023", use_container_width=True):
-    create_figures(
-        data="coe_kpi_05_2023.xlsx",
-        current_month=6,
-        download_figs=download_checkbox,
-        # interactive_charts=interactive_charts_check
-        # start_month=start_month,
-        # start_year=start_year,
-        # end_month=end_month,
-        # end_year=end_year,
-    )
+# Remember the selected archive so switching tabs (which reruns the script)
+# keeps showing it until another archive or a new upload is picked.
+archive_store = get_archive_store()
+for entry in archive_store.entries:
+    if st.sidebar.button(label=entry.label, use_container_width=True):
+        st.session_state.archived_report = entry.id
+
+report_profiler = Profiler(trace_memory=True) if diagnostics_checkbox else NO_PROFILER
+report_name = None
+
+archived = archive_store.get(st.session_state.get("archived_report"))
+if archived is not None:
+    report_name = archived.label
+    with report_profiler:
+        create_figures(
+            data=archived.source,
+            current_month=archived.current_month,
+            download_figs=download_checkbox,
+            archived=archived,
+            profiler=report_profiler,
+            interactive_charts=interactive_charts_check,
+            current_year=archived.current_year,
+            date_range=date_range,
+            statistic=statistic_select,
+        )
     file_removed = True
 
+if not uploaded_file:
+    st.session_state.pop("stored_upload", None)
+
 if uploaded_file and not file_removed:
     # will only work for current month
     # for example, in june, can run the report with all of may data, but can't run a report with no may data
@@ -1188,7 +759,20 @@ if uploaded_file and not file_removed:
         f"{uploaded_file.name} has been successfully uploaded!",
         icon="✅",
     )
-    create_figures(
-        data=uploaded_file,
-        download_figs=download_checkbox,
-    )
+    report_name = uploaded_file.name
+    with report_profiler:
+        create_figures(
+            data=stored_upload(uploaded_file),
+            download_figs=download_checkbox,
+            use_history=history_checkbox,
+            interactive_charts=interactive_charts_check,
+            profiler=report_profiler,
+            date_range=date_range,
+            statistic=statistic_select,
+        )
+
+if diagnostics_checkbox:
+    if report_profiler.timings:
+        show_diagnostics(diagnostics_section, report_profiler, report=report_name)
+    else:
+        diagnostics_section.caption("Timings appear once a report is shown.")
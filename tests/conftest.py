@@ -0,0 +1,27 @@
+from pathlib import Path
+
+import pytest
+
+from coe_kpi.ingest import read_export
+from coe_kpi.preprocess import preprocess_tickets
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+EXPORTS = {
+    "2023-04": REPO_ROOT / "coe_kpi_04_2023.xlsx",
+    "2023-05": REPO_ROOT / "coe_kpi_05_2023.xlsx",
+}
+
+
+@pytest.fixture(scope="session")
+def tickets():
+    """The shipped exports' preprocessed tickets, by export month."""
+    return {
+        month: preprocess_tickets(read_export(path)) for month, path in EXPORTS.items()
+    }
+
+
+def sorted_cube(cube):
+    """``cube`` with plain-object keys in a fixed row order, for comparisons."""
+    keys = list(cube.columns[:5])
+    cube = cube.astype({key: object for key in keys[2:]})
+    return cube.sort_values(keys, na_position="first").reset_index(drop=True)
@@ -0,0 +1,179 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from coe_kpi import aggregate
+from coe_kpi.aggregate import build_cube, merge_cubes
+from tests.conftest import EXPORTS, sorted_cube
+
+PRIMARY_YEAR = 2019
+
+
+def _baseline_frames(path):
+    """The report's frames computed the way the app did before the cube."""
+    df = pd.read_excel(path).drop(
+        columns=["Latest Update", "Tickets", "Assignee name", "Requester name"]
+    )
+    names = list(df.columns)
+    df = df.rename(
+        columns={
+            names[0]: "ticket_id",
+            names[1]: "client_name",
+            names[2]: "ticket_status",
+            names[3]: "ticket_type",
+            names[4]: "ticket_subject",
+            names[5]: "ticket_priority",
+            names[7]: "environment",
+            names[8]: "product_type",
+            names[6]: "requested_date",
+            names[9]: "ticket_updated_date",
+        }
+    )
+    df = df.astype(
+        {"requested_date": "datetime64[ns]", "ticket_updated_date": "datetime64[ns]"}
+    )
+    df["days_active"] = df.ticket_updated_date - df.requested_date
+    df["month_opened"] = df.requested_date.dt.month
+    df["year_opened"] = df.requested_date.dt.year
+
+    frames = {}
+    frames["monthly_counts"] = (
+        df.groupby(by=["year_opened", "month_opened"])
+        .month_opened.count()
+        .reset_index(name="ticket_count")
+    )
+    frames["monthly_close_times"] = (
+        df.query(f"ticket_status == 'Closed' and year_opened >= {PRIMARY_YEAR}")
+        .groupby(by=["year_opened", "month_opened"])
+        .days_active.mean()
+        .reset_index(name="average_days_active")
+    )
+
+    products = list(
+        df.query("year_opened >= 2022 and product_type.notnull()")
+        .product_type.value_counts()[:6]
+        .index
+    )
+    if "Other" in products:
+        products.remove("Other")
+    frames["products"] = products + ["Other"]
+    with_products = df[df.product_type.notna()].copy()
+    with_products.loc[
+        ~with_products.product_type.isin(frames["products"]), "product_type"
+    ] = "Other"
+    frames["product_counts"] = (
+        with_products.groupby(by=["year_opened", "month_opened", "product_type"])
+        .product_type.count()
+        .reset_index(name="count")
+    )
+    frames["product_close_times"] = (
+        with_products[with_products.ticket_status == "Closed"]
+        .groupby(by=["year_opened", "month_opened", "product_type"])
+        .days_active.mean()
+        .reset_index(name="average_days_active")
+    )
+
+    clients = df.copy()
+    clients.loc[
+        clients.client_name == "The Red Sea Development Co., (TRSDC)", "client_name"
+    ] = "TRSDC"
+    frames["clients"] = list(
+        clients.query("year_opened >= 2022").client_name.value_counts()[:5].index
+    ) + ["Other"]
+    clients.loc[~clients.client_name.isin(frames["clients"]), "client_name"] = "Other"
+    frames["client_counts"] = (
+        clients.groupby(by=["year_opened", "month_opened", "client_name"])
+        .client_name.count()
+        .reset_index(name="count")
+    )
+    return frames
+
+
+@pytest.fixture(scope="module", params=sorted(EXPORTS))
+def export(request, tickets):
+    """(cube, baseline frames) for each shipped export."""
+    month = request.param
+    return build_cube(tickets[month]), _baseline_frames(EXPORTS[month])
+
+
+def _sorted(frame, keys):
+    frame = frame.astype({key: object for key in keys[2:]})
+    return frame.sort_values(keys).reset_index(drop=True)
+
+
+def _assert_same(result, expected, keys, columns):
+    pd.testing.assert_frame_equal(
+        _sorted(result, keys)[keys + columns],
+        _sorted(expected, keys)[keys + columns],
+        check_dtype=False,
+    )
+
+
+def _assert_same_means(result, expected, keys):
+    result, expected = _sorted(result, keys), _sorted(expected, keys)
+    expected["rounded_days_active"] = np.ceil(
+        expected.average_days_active.dt.total_seconds() / (24 * 3600)
+    ).astype(int)
+    _assert_same(result, expected, keys, ["rounded_days_active"])
+    difference = result.average_days_active - expected.average_days_active
+    assert difference.abs().max() < pd.Timedelta(seconds=1)
+
+
+def test_monthly_counts(export):
+    cube, baseline = export
+    _assert_same(
+        aggregate.monthly_counts(cube),
+        baseline["monthly_counts"],
+        ["year_opened", "month_opened"],
+        ["ticket_count"],
+    )
+
+
+def test_monthly_close_times(export):
+    cube, baseline = export
+    _assert_same_means(
+        aggregate.monthly_close_times(cube, PRIMARY_YEAR),
+        baseline["monthly_close_times"],
+        ["year_opened", "month_opened"],
+    )
+
+
+def test_top_members(export):
+    cube, baseline = export
+    assert aggregate.top_products(cube) == baseline["products"]
+    assert aggregate.top_clients(cube) == baseline["clients"]
+
+
+def test_product_and_client_tabs(export):
+    cube, baseline = export
+    products, clients = baseline["products"], baseline["clients"]
+    keys = ["year_opened", "month_opened"]
+    _assert_same(
+        aggregate.product_counts(cube, products),
+        baseline["product_counts"],
+        keys + ["product_type"],
+        ["count"],
+    )
+    _assert_same(
+        aggregate.client_counts(cube, clients),
+        baseline["client_counts"],
+        keys + ["client_name"],
+        ["count"],
+    )
+    _assert_same_means(
+        aggregate.product_close_times(cube, products),
+        baseline["product_close_times"],
+        keys + ["product_type"],
+    )
+
+
+def test_merged_chunk_cubes_equal_one_cube(tickets):
+    may = tickets["2023-05"]
+    chunks = [
+        build_cube(may.iloc[start : start + 3000]) for start in range(0, len(may), 3000)
+    ]
+    pd.testing.assert_frame_equal(
+        sorted_cube(merge_cubes(chunks)),
+        sorted_cube(build_cube(may)),
+        check_dtype=False,
+    )
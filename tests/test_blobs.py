@@ -0,0 +1,68 @@
+import gc
+import hashlib
+import io
+import os
+
+from coe_kpi.blobs import BlobStore
+
+
+class Upload(io.BytesIO):
+    """Stands in for Streamlit's ``UploadedFile``."""
+
+    def __init__(self, data, name="export.xlsx"):
+        super().__init__(data)
+        self.name = name
+
+
+def _age(blob, seconds):
+    os.utime(blob.path, (seconds, seconds))
+
+
+def test_put_stores_by_content_digest(tmp_path):
+    store = BlobStore(tmp_path)
+    data = b"ticket export" * 1000
+
+    blob = store.put(Upload(data), chunk_size=1024)
+    again = store.put(Upload(data, name="renamed.xlsx"))
+
+    assert blob.digest == again.digest == hashlib.sha256(data).hexdigest()
+    assert blob.path == again.path == tmp_path / f"{blob.digest}.xlsx"
+    assert blob.path.read_bytes() == data
+    assert store.put(Upload(b"csv", name="export.csv")).path.suffix == ".csv"
+    assert list((tmp_path / "incoming").iterdir()) == []
+
+
+def test_handles_pin_their_blob(tmp_path):
+    store = BlobStore(tmp_path)
+    blob = store.put(Upload(b"a"))
+    other = store.get(blob.digest)
+    assert store.refcount(blob.digest) == 2
+
+    del other
+    gc.collect()
+    assert store.refcount(blob.digest) == 1
+    del blob
+    gc.collect()
+    assert store.refcount(hashlib.sha256(b"a").hexdigest()) == 0
+
+
+def test_eviction_is_lru_and_skips_pinned_blobs(tmp_path):
+    store = BlobStore(tmp_path, max_bytes=250)
+    pinned = store.put(Upload(b"p" * 100))
+    unpinned = store.put(Upload(b"u" * 100))
+    unpinned_path = unpinned.path
+    _age(pinned, 1)
+    _age(unpinned, 2)
+    del unpinned
+    gc.collect()
+
+    # Over budget: the oldest blob is pinned, so the unpinned one goes.
+    newest = store.put(Upload(b"n" * 100))
+
+    assert pinned.path.exists()
+    assert newest.path.exists()
+    assert not unpinned_path.exists()
+
+
+def test_get_missing_digest(tmp_path):
+    assert BlobStore(tmp_path).get("0" * 64) is None
@@ -0,0 +1,20 @@
+from coe_kpi.__main__ import build_jobs, build_parser
+from coe_kpi.batch import ReportJob
+from tests.conftest import EXPORTS
+
+
+def _jobs(*argv):
+    return build_jobs(build_parser().parse_args([str(arg) for arg in argv]))
+
+
+def test_exports_default_to_their_latest_month():
+    # As the app dates uploads: the May 2023 export runs in June.
+    assert _jobs(EXPORTS["2023-05"]) == [ReportJob(str(EXPORTS["2023-05"]), 2023, 6)]
+
+
+def test_requested_months_replace_the_default():
+    source = str(EXPORTS["2023-05"])
+    assert _jobs(source, "--month", "2023-03", "--months", "2023-03:2023-04") == [
+        ReportJob(source, 2023, 3),
+        ReportJob(source, 2023, 4),
+    ]
@@ -0,0 +1,44 @@
+from datetime import date
+
+import pandas as pd
+
+from coe_kpi.aggregate import build_cube, top_clients, top_products
+from coe_kpi.daterange import ReportRange
+from coe_kpi.months import month_key
+from coe_kpi.report import ReportPeriod
+
+
+def test_range_ticket_counts(tickets):
+    may = tickets["2023-05"]
+    report_range = ReportRange(build_cube(may))
+    keys = month_key(may.year_opened, may.month_opened)
+
+    for start, end in [
+        ((2022, 1), (2022, 12)),
+        ((2019, 6), (2023, 5)),
+        ((2030, 1), (2030, 2)),
+    ]:
+        start_key, end_key = int(month_key(*start)), int(month_key(*end))
+        expected = int(((keys >= start_key) & (keys <= end_key)).sum())
+        assert report_range.ticket_count(start_key, end_key) == expected
+
+
+def test_range_top_members_match_the_default_ranking(tickets):
+    cube = build_cube(tickets["2023-05"])
+    report_range = ReportRange(cube)
+    # The default ranking counts everything since 2022.
+    start, end = int(month_key(2022, 1)), int(month_key(2030, 12))
+
+    assert report_range.top_products(start, end) == top_products(cube)
+    assert report_range.top_clients(start, end) == top_clients(cube)
+
+
+def test_uploads_are_dated_like_the_archive(tickets):
+    # archive/index.json runs the April export in May and May's in June.
+    assert ReportPeriod.latest(build_cube(tickets["2023-04"])) == ReportPeriod(2023, 5)
+    assert ReportPeriod.latest(build_cube(tickets["2023-05"])) == ReportPeriod(2023, 6)
+
+    # An empty export is reported as of today.
+    today = date.today()
+    empty = pd.DataFrame({"year_opened": [], "month_opened": []})
+    assert ReportPeriod.latest(empty) == ReportPeriod(today.year, today.month)
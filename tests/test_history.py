@@ -0,0 +1,74 @@
+import pandas as pd
+
+from coe_kpi.aggregate import build_cube
+from coe_kpi.history import TicketHistory, _concat_tickets
+from coe_kpi.sketch import SKETCH_KEYS, build_sketch
+from tests.conftest import sorted_cube
+
+
+def _expected_tickets(april, may):
+    # Tickets a later export no longer lists are kept.
+    dropped = april[~april.ticket_id.isin(may.ticket_id)]
+    return _concat_tickets([may, dropped])
+
+
+def _expected_cube(april, may):
+    return build_cube(_expected_tickets(april, may))
+
+
+def _sorted_sketch(sketch):
+    sketch = sketch.astype({"product_type": object, "client_name": object})
+    return sketch.sort_values(SKETCH_KEYS + ["bucket"]).reset_index(drop=True)
+
+
+def test_merging_two_exports_matches_a_direct_build(tickets, tmp_path):
+    april, may = tickets["2023-04"], tickets["2023-05"]
+    history = TicketHistory(tmp_path)
+    history.merge(april, "april")
+    update = history.merge(may, "may")
+
+    # May drops tickets April listed, so the merge compares every ticket.
+    assert update.full_scan
+    pd.testing.assert_frame_equal(
+        sorted_cube(update.cube), sorted_cube(_expected_cube(april, may))
+    )
+    pd.testing.assert_frame_equal(
+        _sorted_sketch(update.close_time_sketch),
+        _sorted_sketch(build_sketch(_expected_tickets(april, may))),
+        check_dtype=False,
+    )
+
+
+def test_watermark_merge_is_caught_up_by_a_full_scan(tickets, tmp_path):
+    april, may = tickets["2023-04"], tickets["2023-05"]
+    history = TicketHistory(tmp_path)
+    history.merge(april, "april")
+    partial = history.merge(may, "may", full_scan=False)
+
+    assert not partial.full_scan
+    # Bulk renames in May didn't move ticket_updated_date.
+    assert not sorted_cube(partial.cube).equals(sorted_cube(_expected_cube(april, may)))
+
+    full = history.merge(may, "may", full_scan=True)
+    assert full.full_scan
+    assert full.revision != partial.revision
+    pd.testing.assert_frame_equal(
+        sorted_cube(full.cube), sorted_cube(_expected_cube(april, may))
+    )
+
+
+def test_merging_an_export_again_is_a_no_op(tickets, tmp_path):
+    history = TicketHistory(tmp_path)
+    first = history.merge(tickets["2023-04"], "april")
+    again = history.merge(tickets["2023-04"], "april")
+
+    assert (again.inserted, again.updated) == (0, 0)
+    assert again.revision == first.revision
+
+
+def test_history_reloads_from_disk(tickets, tmp_path):
+    update = TicketHistory(tmp_path).merge(tickets["2023-04"], "april")
+    reloaded = TicketHistory(tmp_path)
+
+    assert reloaded.revision == update.revision
+    pd.testing.assert_frame_equal(sorted_cube(reloaded.cube), sorted_cube(update.cube))
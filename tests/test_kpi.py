@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+from coe_kpi import aggregate
+from coe_kpi.aggregate import build_cube
+from coe_kpi.kpi import KpiLookup, metric_value
+
+
+def _query_value(frame, year, month, **members):
+    # How the app looked values up before KpiLookup.
+    rows = frame.query(f"year_opened == {year} and month_opened == {month}")
+    for column, member in members.items():
+        rows = rows[rows[column] == member]
+    return rows.iloc[0, -1] if len(rows) else np.nan
+
+
+def test_monthly_counts_match_the_frame(tickets):
+    counts = aggregate.monthly_counts(build_cube(tickets["2023-05"]))[
+        ["year_opened", "month_opened", "ticket_count"]
+    ]
+    lookup = KpiLookup(counts, "ticket_count")
+
+    for year, month in [(2023, 5), (2023, 1), (2020, 3)]:
+        comparison = lookup.compare(year, month)
+        current = _query_value(counts, year, month)
+        previous_month = _query_value(
+            counts, year - (month == 1), 12 if month == 1 else month - 1
+        )
+        previous_year = _query_value(counts, year - 1, month)
+        assert comparison.current[0] == current
+        assert comparison.previous_month[0] == previous_month
+        assert comparison.previous_year[0] == previous_year
+        assert comparison.month_delta[0] == round(
+            (current - previous_month) / previous_month * 100, 1
+        )
+        assert comparison.year_delta[0] == round(
+            (current - previous_year) / previous_year * 100, 1
+        )
+
+
+def test_members_and_missing_cells():
+    frame = pd.DataFrame(
+        {
+            "year_opened": [2022, 2023, 2023, 2023],
+            "month_opened": [1, 1, 1, 1],
+            "product_type": ["A", "A", "B", "Unlisted"],
+            "count": [10, 15, 4, 99],
+        }
+    )
+    lookup = KpiLookup(frame, "count", dimension="product_type", members=["A", "B"])
+
+    comparison = lookup.compare(2023, 1)
+    np.testing.assert_array_equal(comparison.current, [15, 4])
+    np.testing.assert_array_equal(comparison.previous_year, [10, np.nan])
+    np.testing.assert_array_equal(comparison.year_delta, [50.0, np.nan])
+    # December 2022 has no data.
+    assert np.isnan(comparison.month_delta).all()
+    # Months outside the frame's years.
+    assert np.isnan(lookup.at(2030, 6)).all()
+
+
+def test_empty_frame():
+    frame = pd.DataFrame({"year_opened": [], "month_opened": [], "count": []})
+    assert np.isnan(KpiLookup(frame, "count").compare(2023, 5).current).all()
+
+
+def test_metric_value():
+    assert metric_value(np.float64(7.0)) == 7
+    assert metric_value(np.nan) is None
@@ -0,0 +1,43 @@
+import math
+
+import pytest
+
+from coe_kpi.aggregate import build_cube
+from coe_kpi.months import month_key
+from coe_kpi.report import ReportEngine, ReportPeriod
+from coe_kpi.sketch import build_sketch
+
+SINGLE_VALUE_TABS = [
+    "tickets_per_month",
+    "average_days_to_close",
+    "median_days_to_close",
+    "p90_days_to_close",
+]
+
+
+@pytest.fixture(scope="module")
+def may(tickets):
+    may = tickets["2023-05"]
+    return build_cube(may), build_sketch(may)
+
+
+def _metrics(cube, sketch, period, name):
+    engine = ReportEngine(cube, period, "digest", close_time_sketch=sketch)
+    return [
+        (metric.value, metric.month_delta, metric.year_delta)
+        for metric in engine.metrics(name)
+    ]
+
+
+@pytest.mark.parametrize("start, end", [((2023, 1), (2023, 3)), ((2023, 1), (2023, 1))])
+@pytest.mark.parametrize("name", SINGLE_VALUE_TABS)
+def test_range_kpis_compare_months_before_the_range(may, name, start, end):
+    cube, sketch = may
+    period = ReportPeriod.for_range((int(month_key(*start)), int(month_key(*end))))
+    metrics = _metrics(cube, sketch, period, name)
+
+    # The range only cuts the charts; its KPIs are the default report's.
+    default = ReportPeriod(period.current_year, period.current_month)
+    assert metrics == _metrics(cube, sketch, default, name)
+    [(value, month_delta, year_delta)] = metrics
+    assert math.isfinite(month_delta) and math.isfinite(year_delta)
@@ -0,0 +1,104 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from coe_kpi.result_cache import ResultCache, SingleFlight
+
+
+def _blocking_compute(started, release, calls, value="result"):
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return value
+
+    return compute
+
+
+def test_concurrent_misses_compute_once():
+    flight = SingleFlight()
+    started, release, calls = threading.Event(), threading.Event(), []
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        owner = pool.submit(
+            flight.do, "key", _blocking_compute(started, release, calls)
+        )
+        started.wait(5)
+        # Claimed while the owner is still computing.
+        waiters = [flight.claim("key") for _ in range(3)]
+        release.set()
+        assert owner.result() == "result"
+
+    assert [owns for _, owns in waiters] == [False] * 3
+    assert [future.result() for future, _ in waiters] == ["result"] * 3
+    assert len(calls) == 1
+
+
+def test_waiters_get_the_owners_exception_and_failures_are_retried():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+
+    def fail():
+        started.set()
+        release.wait(5)
+        raise ValueError("bad export")
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        owner = pool.submit(flight.do, "key", fail)
+        started.wait(5)
+        waiter, _ = flight.claim("key")
+        release.set()
+        for future in (owner, waiter):
+            with pytest.raises(ValueError, match="bad export"):
+                future.result()
+
+    assert flight.do("key", lambda: "retried") == "retried"
+
+
+def test_result_cache_hits_and_lru_eviction():
+    cache = ResultCache(max_entries=2)
+    calls = []
+
+    def compute(key):
+        calls.append(key)
+        return key.upper()
+
+    assert cache.get_or_compute("a", lambda: compute("a")) == "A"
+    assert cache.get_or_compute("a", lambda: compute("a")) == "A"
+    cache.get_or_compute("b", lambda: compute("b"))
+    # Using "a" again makes "b" the least recently used, so "c" evicts it.
+    cache.get_or_compute("a", lambda: compute("a"))
+    cache.get_or_compute("c", lambda: compute("c"))
+    cache.get_or_compute("a", lambda: compute("a"))
+    cache.get_or_compute("b", lambda: compute("b"))
+
+    assert calls == ["a", "b", "c", "b"]
+    assert (cache.hits, cache.misses) == (3, 4)
+
+
+def test_result_cache_does_not_store_failures():
+    cache = ResultCache()
+
+    def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute("key", fail)
+    assert cache.get_or_compute("key", lambda: 1) == 1
+
+
+def test_result_cache_shares_one_computation_between_threads():
+    cache = ResultCache()
+    started, release, calls = threading.Event(), threading.Event(), []
+    compute = _blocking_compute(started, release, calls, value=42)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(cache.get_or_compute, "key", compute) for _ in range(4)]
+        started.wait(5)
+        release.set()
+        assert [future.result() for future in futures] == [42] * 4
+
+    # Late callers hit the cache; early ones joined the single flight.
+    assert len(calls) == 1
+    assert cache.misses == 1
@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from coe_kpi.sketch import (
+    ACCURACY,
+    SKETCH_KEYS,
+    bucket_index,
+    bucket_value,
+    build_sketch,
+    merge_sketches,
+    monthly_close_time_quantiles,
+    negated,
+    sketch_quantiles,
+)
+from coe_kpi.stats import QUANTILES
+
+COLUMNS = [statistic.column for statistic in QUANTILES]
+
+
+def _sorted(sketch):
+    sketch = sketch.astype({"product_type": object, "client_name": object})
+    return sketch.sort_values(SKETCH_KEYS + ["bucket"]).reset_index(drop=True)
+
+
+def _closed(tickets):
+    return tickets[
+        (tickets.ticket_status == "Closed")
+        & tickets.requested_date.notna()
+        & tickets.days_active.notna()
+    ]
+
+
+def _exact_quantiles(closed, by):
+    """Exact quantiles in days, rounded up, like the sketch reports them."""
+    seconds = closed.assign(seconds=closed.days_active.dt.total_seconds())
+    grouped = seconds.groupby(by, observed=True).seconds
+    exact = grouped.quantile([statistic.quantile for statistic in QUANTILES])
+    exact = np.ceil(exact.unstack() / (24 * 3600))
+    exact.columns = COLUMNS
+    return exact.assign(closed_count=grouped.size())
+
+
+def _assert_within_bounds(result, exact):
+    assert (result.closed_count.to_numpy() == exact.closed_count.to_numpy()).all()
+    # Within ACCURACY in seconds, so at most a day more after rounding up.
+    bound = np.maximum(1, np.ceil(exact[COLUMNS].to_numpy() * ACCURACY) + 1)
+    assert (
+        np.abs(result[COLUMNS].to_numpy() - exact[COLUMNS].to_numpy()) <= bound
+    ).all()
+
+
+def test_bucket_values_are_within_accuracy():
+    seconds = np.geomspace(2, 10 * 365 * 24 * 3600, 10_000)
+    values = bucket_value(bucket_index(seconds))
+    assert (np.abs(values - seconds) / seconds <= ACCURACY + 1e-12).all()
+    assert bucket_value(bucket_index([0, 1])).tolist() == [0, 0]
+
+
+def test_merged_chunk_sketches_equal_one_sketch(tickets):
+    may = tickets["2023-05"]
+    chunks = [
+        build_sketch(may.iloc[start : start + 3000])
+        for start in range(0, len(may), 3000)
+    ]
+    pd.testing.assert_frame_equal(
+        _sorted(merge_sketches(chunks)), _sorted(build_sketch(may)), check_dtype=False
+    )
+
+
+def test_subtracting_a_sketch_removes_its_tickets(tickets):
+    may = tickets["2023-05"]
+    head, tail = may.iloc[:5000], may.iloc[5000:]
+    remaining = merge_sketches([build_sketch(may), negated(build_sketch(head))])
+    pd.testing.assert_frame_equal(
+        _sorted(remaining), _sorted(build_sketch(tail)), check_dtype=False
+    )
+
+
+@pytest.mark.parametrize("month", ["2023-04", "2023-05"])
+def test_monthly_quantiles_are_within_bounds(tickets, month):
+    closed = _closed(tickets[month])
+    result = monthly_close_time_quantiles(build_sketch(tickets[month]), 2019)
+    exact = _exact_quantiles(
+        closed[closed.year_opened >= 2019], ["year_opened", "month_opened"]
+    )
+    _assert_within_bounds(result, exact)
+
+
+def test_rollups_are_within_bounds(tickets):
+    may = tickets["2023-05"]
+    sketch = build_sketch(may)
+    closed = _closed(may)
+
+    yearly = sketch_quantiles(sketch, ["year_opened"])
+    _assert_within_bounds(yearly, _exact_quantiles(closed, ["year_opened"]))
+
+    quarters = sketch.assign(quarter=(sketch.month_opened - 1) // 3)
+    quarterly = sketch_quantiles(quarters, ["year_opened", "quarter"])
+    closed = closed.assign(quarter=(closed.month_opened - 1) // 3)
+    _assert_within_bounds(
+        quarterly, _exact_quantiles(closed, ["year_opened", "quarter"])
+    )
+
+
+def test_empty_sketch(tickets):
+    sketch = build_sketch(tickets["2023-05"].iloc[:0])
+    result = monthly_close_time_quantiles(sketch, 2019)
+    assert len(result) == 0
+    assert {"closed_count", *COLUMNS} <= set(result.columns)
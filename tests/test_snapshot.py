@@ -0,0 +1,28 @@
+import threading
+
+import pandas as pd
+
+from coe_kpi.snapshot import SnapshotCache
+
+
+def test_concurrent_writes_of_one_digest(tmp_path):
+    cache = SnapshotCache(tmp_path)
+    df = pd.DataFrame({"ticket_id": range(200_000), "client_name": ["Acme"] * 200_000})
+    threads = [
+        threading.Thread(target=cache.write, args=("digest", df)) for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    pd.testing.assert_frame_equal(cache.read("digest"), df)
+    assert [path.name for path in tmp_path.iterdir()] == ["digest.parquet"]
+
+
+def test_unreadable_snapshot_is_discarded(tmp_path):
+    cache = SnapshotCache(tmp_path)
+    cache.path_for("digest").write_bytes(b"not parquet")
+
+    assert cache.read("digest") is None
+    assert not cache.path_for("digest").exists()